@@ -9,9 +9,10 @@ import yaml
 import random
 import urllib.parse
 from icecream import ic
-import markdown
-from markdown.extensions import codehilite, tables, toc
 import time
+from vault_index import load_notes, vault_version
+from semantic_links import SemanticIndex
+from note_preview import PreviewCache
 
 # Initialize vault directory
 VAULT_PATH = Path("vault")
@@ -20,9 +21,32 @@ VAULT_PATH.mkdir(exist_ok=True)
 # YAML config file path
 CONFIG_PATH = VAULT_PATH / "config.yml"
 
+# Note embeddings cache for related-note suggestions
+SEMANTIC_CACHE_PATH = VAULT_PATH / ".semantic_cache.pkl"
+
+# Rendered graph HTML kept per (vault version, selected note, labels, height), shared by all sessions
+GRAPH_HTML_CACHE_SIZE = 8
+
 # Page config
 st.set_page_config(page_title="GraphIQ", layout="wide", initial_sidebar_state="expanded")
 
+# The graph panel runs as a fragment, so its own controls rerun just the panel
+graph_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda func: func)
+
+@st.cache_resource
+def get_semantic_index():
+    """One note embedding index per server process, so the encoder model is loaded once"""
+    return SemanticIndex(SEMANTIC_CACHE_PATH)
+
+@st.cache_resource
+def get_preview_cache():
+    """
+    One preview cache per server process. Graph and wiki-link clicks
+    navigate by URL, which starts a new session, so a per-session cache
+    would always be empty by the time the click lands.
+    """
+    return PreviewCache()
+
 # Initialize session state
 if 'selected_file' not in st.session_state:
     st.session_state.selected_file = None
@@ -450,38 +474,8 @@ def create_markdown_editor(content, file_path):
     
     return edited_content
 
-def render_markdown_preview(content):
-    """Render markdown content with wiki link support"""
-    # Configure markdown with extensions
-    md = markdown.Markdown(
-        extensions=['codehilite', 'tables', 'toc', 'fenced_code'],
-        extension_configs={
-            'codehilite': {
-                'css_class': 'highlight',
-                'use_pygments': False
-            }
-        }
-    )
-    
-    # Process wiki links before markdown conversion
-    def process_wiki_links(text):
-        def wiki_link_replacer(match):
-            link_text = match.group(1)
-            encoded_link = urllib.parse.quote(link_text)
-            return f'<a href="javascript:void(0)" class="wiki-link" onclick="selectWikiLink(\'{encoded_link}\')">{link_text}</a>'
-        
-        return re.sub(r'\[\[(.*?)\]\]', wiki_link_replacer, text)
-    
-    # Process content
-    processed_content = process_wiki_links(content)
-    html_content = md.convert(processed_content)
-    
-    # Wrap in preview container
-    preview_html = f'''
-    <div class="markdown-preview">
-        {html_content}
-    </div>
-    
+# Navigation for wiki links in rendered previews; kept out of the f-string below
+WIKI_LINK_SCRIPT = """
     <script>
     function selectWikiLink(linkText) {
         const decodedLink = decodeURIComponent(linkText);
@@ -493,18 +487,40 @@ def render_markdown_preview(content):
         window.location.href = url.href;
     }
     </script>
+"""
+
+def render_markdown_preview(file_path):
+    """Render a note with wiki link support, using the pre-rendered HTML when it's current"""
+    try:
+        html_content = get_preview_cache().get(file_path)
+    except (OSError, UnicodeDecodeError) as e:
+        st.error(f"Could not read {file_path.name}: {e}")
+        return
+    
+    # Wrap in preview container
+    preview_html = f'''
+    <div class="markdown-preview">
+        {html_content}
+    </div>
+    {WIKI_LINK_SCRIPT}
     '''
     
     st.markdown(preview_html, unsafe_allow_html=True)
 
-def extract_links(content):
-    """Extract wiki links from content"""
-    return re.findall(r'\[\[(.*?)\]\]', content)
+def highlight_node(G, node):
+    """Emphasise the selected note"""
+    if node in G:
+        attrs = G.nodes[node]
+        attrs.update({
+            "borderWidth": 4,
+            "borderColor": "#ff4444",
+            "size": attrs["size"] + 10
+        })
 
-def build_enhanced_graph(vault_path, selected_node=None):
-    """Build enhanced graph with better visualization"""
+def build_enhanced_graph(vault_path, selected_node=None, files=None):
+    """Build enhanced graph with better visualization; returns (graph, index stats, semantic stats)"""
     G = nx.Graph()
-    files = list(Path(vault_path).rglob("*.md"))
+    files = list(Path(vault_path).rglob("*.md")) if files is None else files
     
     global folder_colors
     
@@ -517,6 +533,12 @@ def build_enhanced_graph(vault_path, selected_node=None):
     # Save updated colors to YAML
     save_folder_colors(folder_colors)
     
+    # Read and parse every note once, concurrently
+    note_contents, note_links, index_stats = load_notes(files)
+    
+    # Embed new or changed notes for related-note suggestions
+    semantic_stats = get_semantic_index().update(note_contents)
+    
     # Add nodes with enhanced styling
     for file in files:
         stem = file.stem
@@ -525,9 +547,7 @@ def build_enhanced_graph(vault_path, selected_node=None):
         color = folder_colors.get(folder, "#cccccc")
         
         # Count connections for node size
-        with open(file, "r", encoding="utf-8") as f:
-            content = f.read()
-        links = extract_links(content)
+        links = note_links[file]
         node_size = min(50, max(20, len(links) * 5 + 20))
         
         node_attrs = {
@@ -539,23 +559,16 @@ def build_enhanced_graph(vault_path, selected_node=None):
             "borderColor": "#666666"
         }
         
-        # Highlight selected node
-        if stem == selected_node:
-            node_attrs.update({
-                "borderWidth": 4,
-                "borderColor": "#ff4444",
-                "size": node_size + 10
-            })
-        
         G.add_node(stem, **node_attrs)
     
+    # Highlight selected node
+    highlight_node(G, selected_node)
+    
     # Add edges with weights
     edge_weights = {}
     for file in files:
         src_stem = file.stem
-        with open(file, "r", encoding="utf-8") as f:
-            content = f.read()
-        links = extract_links(content)
+        links = note_links[file]
         
         for link in links:
             if link in G:
@@ -566,13 +579,16 @@ def build_enhanced_graph(vault_path, selected_node=None):
     for (node1, node2), weight in edge_weights.items():
         G.add_edge(node1, node2, weight=weight, width=min(10, weight * 2))
     
-    return G
+    return G, index_stats, semantic_stats
 
-def create_interactive_graph(graph, height="600px"):
-    """Create interactive graph with click handling"""
+def create_interactive_graph(graph, height="600px", show_labels=True):
+    """Create interactive graph HTML with click handling; None if it can't be generated"""
     try:
         net = Network(height=height, width='100%', bgcolor="#fafafa", font_color="black")
         net.from_nx(graph)
+        if not show_labels:
+            for node in net.nodes:
+                node["label"] = ""
         
         # Configure physics
         net.set_options("""
@@ -639,16 +655,119 @@ def create_interactive_graph(graph, height="600px"):
         # Save modified HTML
         with open("graph.html", "w", encoding="utf-8") as f:
             f.write(html_content)
-        
-        # Display in container
-        st.markdown('<div class="graph-container">', unsafe_allow_html=True)
-        with open("graph.html", "r", encoding="utf-8") as f:
-            components.html(f.read(), height=int(height.replace("px", "")))
-        st.markdown('</div>', unsafe_allow_html=True)
+        return html_content
             
     except Exception as e:
         st.error(f"Graph generation failed: {str(e)}")
         st.code(str(e))
+        return None
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def vault_graph(version, _files):
+    """
+    The vault's graph and index stats for one vault_version, shared by every
+    session, so navigating by URL (a new session) doesn't re-read the vault
+    """
+    graph, index_stats, semantic_stats = build_enhanced_graph(VAULT_PATH, files=_files)
+    return {
+        "graph": graph,
+        "index_stats": index_stats,
+        "semantic_stats": semantic_stats,
+        "note_paths": {file.stem: file for file in _files},
+    }
+
+@st.cache_data(max_entries=GRAPH_HTML_CACHE_SIZE, show_spinner=False)
+def graph_html(version, selected_node, show_labels, graph_height, _files):
+    """pyvis HTML of the vault graph with selected_node highlighted"""
+    G = vault_graph(version, _files)["graph"].copy()
+    highlight_node(G, selected_node)
+    return create_interactive_graph(G, graph_height, show_labels)
+
+@graph_fragment
+def render_graph_panel(selected_file):
+    """
+    Knowledge graph column. Notes are only re-read and the graph only
+    rebuilt when the vault version changes, and the pyvis HTML only when
+    the selection or graph options change. Both caches are process-wide,
+    so reruns and new sessions from link clicks reuse earlier renders.
+    """
+    st.markdown("### 🕸️ Knowledge Graph")
+    
+    # Graph controls
+    graph_col1, graph_col2 = st.columns(2)
+    with graph_col1:
+        show_labels = st.checkbox("Show Labels", value=True)
+    with graph_col2:
+        graph_height = st.selectbox("Height", ["400px", "500px", "600px", "700px"], index=2)
+    
+    # Build and display graph
+    selected_node = Path(selected_file).stem
+    file_path = VAULT_PATH / selected_file
+    files = list(VAULT_PATH.rglob("*.md"))
+    version = vault_version(files)
+    vault = vault_graph(version, files)
+    G = vault["graph"]
+    note_paths = vault["note_paths"]
+    st.session_state.note_paths = note_paths
+    
+    # Pre-render the notes a click or link is likely to open next
+    if selected_node in G:
+        get_preview_cache().warm(
+            note_paths[neighbor] for neighbor in G.neighbors(selected_node) if neighbor in note_paths)
+    
+    if len(G.nodes()) == 0:
+        st.info("📝 Create more notes with [[wiki links]] to see connections in the graph!")
+        return
+    
+    html_content = graph_html(version, selected_node, show_labels, graph_height, files)
+    
+    if html_content is not None:
+        # Display in container
+        st.markdown('<div class="graph-container">', unsafe_allow_html=True)
+        components.html(html_content, height=int(graph_height.replace("px", "")))
+        st.markdown('</div>', unsafe_allow_html=True)
+    
+    # Graph statistics
+    with st.expander("📊 Graph Statistics"):
+        st.metric("Total Notes", len(G.nodes()))
+        st.metric("Connections", len(G.edges()))
+        
+        index_stats = vault["index_stats"]
+        if index_stats:
+            st.caption(
+                f"Indexed {index_stats.notes} notes in {index_stats.seconds:.2f}s "
+                f"({index_stats.notes_per_second:,.0f} notes/s, {index_stats.parse_mode} parse)"
+            )
+            if index_stats.unreadable:
+                st.warning(
+                    f"{len(index_stats.unreadable)} notes could not be read and are shown without links:\n\n"
+                    + "\n".join(f"- {path}: {reason}" for path, reason in index_stats.unreadable[:10])
+                )
+        
+        if selected_node in G:
+            neighbors = list(G.neighbors(selected_node))
+            st.metric("Connected Notes", len(neighbors))
+            if neighbors:
+                st.write("**Connected to:**")
+                for neighbor in neighbors[:5]:  # Show first 5
+                    st.write(f"• {neighbor}")
+                if len(neighbors) > 5:
+                    st.write(f"... and {len(neighbors) - 5} more")
+            
+            # Semantically similar notes that aren't linked yet
+            related = get_semantic_index().related(
+                file_path, exclude=[note_paths[n] for n in neighbors if n in note_paths])
+            if related:
+                st.write("**Related but unlinked:**")
+                for path, score in related:
+                    st.write(f"• {path.stem} ({score:.0%} similar)")
+        
+        semantic_stats = vault["semantic_stats"]
+        if semantic_stats:
+            st.caption(
+                f"Embeddings: {semantic_stats.backend}, "
+                f"{semantic_stats.embedded} of {semantic_stats.notes} notes re-embedded"
+            )
 
 # Handle URL parameters for navigation
 def handle_navigation():
@@ -658,8 +777,10 @@ def handle_navigation():
     # Handle node clicks from graph
     if "node" in query_params:
         node_name = urllib.parse.unquote(query_params["node"])
-        # Find file with matching stem
-        for file in VAULT_PATH.rglob("*.md"):
+        # Find file with matching stem, from the last graph build when possible
+        known = st.session_state.get("note_paths", {}).get(node_name)
+        candidates = [known] if known is not None and known.exists() else VAULT_PATH.rglob("*.md")
+        for file in candidates:
             if file.stem == node_name:
                 st.session_state.selected_file = str(file.relative_to(VAULT_PATH))
                 st.session_state.edit_mode = False
@@ -690,6 +811,8 @@ with st.sidebar:
             st.rerun()
     with col2:
         if st.button("📊 Graph", key="show_graph"):
+            vault_graph.clear()
+            graph_html.clear()
             st.session_state.graph_update_trigger += 1
     
     # VSCode-style file tree
@@ -768,42 +891,10 @@ if st.session_state.selected_file:
                         st.rerun()
             else:
                 # Preview mode
-                content = file_path.read_text(encoding="utf-8")
-                render_markdown_preview(content)
+                render_markdown_preview(file_path)
         
         with col2:
-            st.markdown("### 🕸️ Knowledge Graph")
-            
-            # Graph controls
-            graph_col1, graph_col2 = st.columns(2)
-            with graph_col1:
-                show_labels = st.checkbox("Show Labels", value=True)
-            with graph_col2:
-                graph_height = st.selectbox("Height", ["400px", "500px", "600px", "700px"], index=2)
-            
-            # Build and display graph
-            selected_node = Path(st.session_state.selected_file).stem
-            G = build_enhanced_graph(VAULT_PATH, selected_node)
-            
-            if len(G.nodes()) > 0:
-                create_interactive_graph(G, graph_height)
-                
-                # Graph statistics
-                with st.expander("📊 Graph Statistics"):
-                    st.metric("Total Notes", len(G.nodes()))
-                    st.metric("Connections", len(G.edges()))
-                    
-                    if selected_node in G:
-                        neighbors = list(G.neighbors(selected_node))
-                        st.metric("Connected Notes", len(neighbors))
-                        if neighbors:
-                            st.write("**Connected to:**")
-                            for neighbor in neighbors[:5]:  # Show first 5
-                                st.write(f"• {neighbor}")
-                            if len(neighbors) > 5:
-                                st.write(f"... and {len(neighbors) - 5} more")
-            else:
-                st.info("📝 Create more notes with [[wiki links]] to see connections in the graph!")
+            render_graph_panel(st.session_state.selected_file)
     else:
         st.error(f"File not found: {st.session_state.selected_file}")
         st.session_state.selected_file = None
@@ -837,3 +928,12 @@ else:
     if not any(VAULT_PATH.rglob("*.md")):
         st.markdown("---")
         if st.button("🎯 Create Sample Notes"):
+            sample_notes = {
+                "Welcome": "# Welcome\n\nThis is your first note. Start with [[Ideas]] or read about [[Linking]].\n",
+                "Ideas": "# Ideas\n\nCollect thoughts here and link them back to [[Welcome]].\n",
+                "Linking": "# Linking\n\nWrap a note name in double brackets, like [[Ideas]], to connect notes.\n",
+            }
+            for name, text in sample_notes.items():
+                (VAULT_PATH / f"{name}.md").write_text(text, encoding="utf-8")
+            st.session_state.selected_file = "Welcome.md"
+            st.rerun()
@@ -0,0 +1,111 @@
+# note_preview.py - Rendered note HTML, cached per file version and warmed in the background
+
+import threading
+import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import markdown
+from vault_index import WIKI_LINK_PATTERN, read_note
+
+# Rendered HTML is keyed by path plus (mtime, size), so a saved edit is a
+# miss without any explicit invalidation. After a note is shown, its graph
+# neighbours are rendered on a small background pool, so following a link
+# or clicking a node finds the HTML ready and only costs a stat().
+PREVIEW_CACHE_SIZE = 512
+WARM_WORKERS = 2
+WARM_LIMIT = 32          # neighbours rendered per viewed note, hubs can have hundreds
+
+MARKDOWN_EXTENSIONS = ['codehilite', 'tables', 'toc', 'fenced_code']
+MARKDOWN_CONFIG = {
+    'codehilite': {
+        'css_class': 'highlight',
+        'use_pygments': False
+    }
+}
+
+def wiki_link_replacer(match):
+    link_text = match.group(1)
+    encoded_link = urllib.parse.quote(link_text)
+    return f'<a href="javascript:void(0)" class="wiki-link" onclick="selectWikiLink(\'{encoded_link}\')">{link_text}</a>'
+
+def markdown_to_html(content):
+    """Render note markdown with wiki links turned into navigation links"""
+    # Markdown instances keep state between conversions, so each render gets its own
+    md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS, extension_configs=MARKDOWN_CONFIG)
+    return md.convert(WIKI_LINK_PATTERN.sub(wiki_link_replacer, content))
+
+def file_version(path):
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+class PreviewCache:
+    """LRU cache of rendered note HTML with a background warming pool"""
+
+    def __init__(self, max_entries=PREVIEW_CACHE_SIZE, workers=WARM_WORKERS):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preview-warm")
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, path, version):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(path)
+                return entry[1]
+        return None
+
+    def _render(self, path, version):
+        html = markdown_to_html(read_note(path))
+        with self.lock:
+            self.entries[path] = (version, html)
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return html
+
+    def get(self, path):
+        """Rendered HTML for a note, from cache when the file hasn't changed"""
+        version = file_version(path)
+        html = self._lookup(path, version)
+        if html is not None:
+            self.hits += 1
+            return html
+        self.misses += 1
+        return self._render(path, version)
+
+    def _warm_one(self, path):
+        try:
+            version = file_version(path)
+            if version is not None and self._lookup(path, version) is None:
+                self._render(path, version)
+        finally:
+            with self.lock:
+                self.pending.discard(path)
+
+    def warm(self, paths, limit=WARM_LIMIT):
+        """Render up to `limit` notes in the background unless cached or already queued"""
+        queued = 0
+        for path in paths:
+            if queued >= limit:
+                break
+            version = file_version(path)
+            with self.lock:
+                if version is None or path in self.pending:
+                    continue
+                entry = self.entries.get(path)
+                if entry is not None and entry[0] == version:
+                    continue
+                self.pending.add(path)
+            self.pool.submit(self._warm_one, path)
+            queued += 1
+        return queued
+
+    def __len__(self):
+        return len(self.entries)
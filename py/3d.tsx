@@ -22,6 +22,42 @@ interface SearchResult extends Node {
   };
 }
 
+// Layouts are written by reduce_pipeline.py (see coords_io.py): positions
+// come from <prefix>.coords.bin, a 16-byte header ('CRD1', count, dims, 0)
+// then little-endian float32 columns, and ids, terms and descriptions from
+// the rows of <prefix>.ndjson, which are in the same order.
+async function loadLayout(prefix: string): Promise<Node[]> {
+  const [coordsResponse, recordsResponse] = await Promise.all([
+    fetch(`/${prefix}.coords.bin`),
+    fetch(`/${prefix}.ndjson`),
+  ]);
+  const buffer = await coordsResponse.arrayBuffer();
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== 'CRD1') {
+    throw new Error(`${prefix}.coords.bin is not a coordinate file`);
+  }
+  const header = new DataView(buffer, 0, 16);
+  const count = header.getUint32(4, true);
+  const dims = header.getUint32(8, true);
+  const columns = new Float32Array(buffer, 16, count * dims);
+
+  const lines = (await recordsResponse.text()).split('\n').filter(line => line.trim());
+  if (lines.length !== count) {
+    throw new Error(`${prefix}.ndjson has ${lines.length} records but coords.bin has ${count}`);
+  }
+  return lines.map((line, row) => {
+    const { id, term, description } = JSON.parse(line);
+    return {
+      id,
+      term,
+      description,
+      x: columns[row],
+      y: columns[count + row],
+      z: columns[2 * count + row],
+    };
+  });
+}
+
 export default function Graph3DView() {
   const containerRef = useRef<HTMLDivElement>(null);
   const sceneRef = useRef<THREE.Scene | null>(null);
@@ -278,8 +314,7 @@ export default function Graph3DView() {
 
   const loadData = async (scene: THREE.Scene) => {
     try {
-      const response = await fetch('/embeddings_3d.json');
-      const data: Node[] = await response.json();
+      const data = await loadLayout('embeddings_3d');
 
       nodesRef.current = data;
 
@@ -0,0 +1,91 @@
+import argparse
+import random
+import time
+from bench_upload import synthetic_documents
+from coords_io import iter_records
+from indexer import MEILISEARCH_URL, PROFILES
+from index_sync import sync_index
+from local_search import LocalSearchIndex, tokenize
+from mock_meili import MockMeilisearch
+from uploader import IndexUploader
+
+
+def sample_queries(documents, count, seed=7):
+    """Exact words, prefixes and one-typo variants drawn from the documents"""
+    rng = random.Random(seed)
+    words = sorted({word for doc in documents for word in tokenize(doc.get('term', '')) if len(word) >= 3})
+    queries = []
+    for word in rng.sample(words, min(count, len(words))):
+        kind = rng.choice(('exact', 'prefix', 'typo'))
+        if kind == 'prefix':
+            word = word[:max(2, len(word) // 2)]
+        elif kind == 'typo' and len(word) >= 5:
+            i = rng.randrange(1, len(word))
+            word = word[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + word[i + 1:]
+        queries.append(word)
+    return queries
+
+
+def time_queries(backend, queries, limit=10):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        backend.search(query, {'limit': limit})
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+
+def report(label, latencies):
+    p50 = latencies[len(latencies) // 2] * 1000
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"  {label:<30} p50 {p50:>7.2f} ms  p95 {p95:>7.2f} ms  {len(latencies) / sum(latencies):>8,.0f} queries/s")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare local in-process search latency with Meilisearch")
+    parser.add_argument('--dataset', help="Layout prefix to load (default: synthetic documents)")
+    parser.add_argument('--docs', type=int, default=20000, help="Synthetic document count")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--url', default=MEILISEARCH_URL, help="Meilisearch to compare against (default: %(default)s)")
+    parser.add_argument('--index', default='bench_search')
+    args = parser.parse_args()
+
+    if args.dataset:
+        documents = iter_records(args.dataset)
+        if documents is None:
+            print(f"✗ {args.dataset}.ndjson / {args.dataset}.json not found")
+            return
+        documents = list(documents)
+    else:
+        documents = list(synthetic_documents(args.docs))
+    settings = PROFILES['2d']['settings']
+    queries = sample_queries(documents, args.queries)
+
+    start = time.perf_counter()
+    local = LocalSearchIndex(args.index, settings)
+    local.add_documents(documents)
+    local.search('warmup')
+    print(f"{len(documents)} documents, {len(queries)} queries, local index built in {time.perf_counter() - start:.2f}s\n")
+    local_p50 = report("local (in-process)", time_queries(local, queries))
+
+    server = IndexUploader(args.url, args.index)
+    try:
+        server.health()
+    except Exception:
+        print(f"\n  Meilisearch not reachable at {args.url}; comparing against the mock server instead")
+        print("  (the mock scans every document, so its numbers are only an HTTP round-trip floor)")
+        with MockMeilisearch() as mock:
+            server = IndexUploader(mock.url, args.index)
+            sync_index(server, documents, settings, None, full=True)
+            report("mock server (HTTP)", time_queries(server, queries))
+        return
+
+    sync_index(server, documents, settings, None, full=True)
+    server_p50 = report("Meilisearch (HTTP)", time_queries(server, queries))
+    print(f"\n  Local p50 is {server_p50 / local_p50:.1f}x {'faster' if server_p50 > local_p50 else 'slower'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+from sphere_layout import assign_to_sphere, fibonacci_sphere, unit_directions
+
+
+def clustered_cloud(count, clusters=10, seed=42):
+    """Gaussian blobs of mixed width, the shape UMAP output usually has"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, 3)) * 5
+    widths = rng.uniform(0.2, 1.0, size=(count, 1))
+    return (centers[rng.integers(0, clusters, count)] + rng.normal(size=(count, 3)) * widths).astype(np.float32)
+
+
+def uniform_cloud(count, seed=42):
+    return np.random.default_rng(seed).normal(size=(count, 3)).astype(np.float32)
+
+
+def neighbor_overlap(before, after, k=10, sample=2000, seed=0):
+    """Mean share of each sampled point's k nearest neighbors that are still among its k nearest"""
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(before), min(sample, len(before)), replace=False)
+    _, near_before = cKDTree(before).query(before[picked], k=k + 1)
+    _, near_after = cKDTree(after).query(after[picked], k=k + 1)
+    return np.mean([len(set(a[1:]) & set(b[1:])) / k for a, b in zip(near_before, near_after)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time assign_to_sphere and measure how much local structure it keeps")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000, 40000, 100000, 500000])
+    parser.add_argument('--clusters', type=int, default=10)
+    args = parser.parse_args()
+
+    for label, make in (("clustered", lambda n: clustered_cloud(n, args.clusters)), ("uniform", uniform_cloud)):
+        print(f"{label}:")
+        for count in args.sizes:
+            coords = make(count)
+            slots = fibonacci_sphere(count)
+            start = time.perf_counter()
+            assignment = assign_to_sphere(coords, slots)
+            elapsed = time.perf_counter() - start
+            assert len(np.unique(assignment)) == count, "assignment is not a permutation"
+
+            directions = np.asarray(unit_directions(coords))
+            overlap = neighbor_overlap(directions, slots[assignment])
+            print(f"  {count:>9,} points  {elapsed:>7.2f}s  {count / elapsed:>10,.0f} points/s  "
+                  f"{overlap:.0%} of 10 nearest neighbors kept")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import string
+import tempfile
+import time
+from coords_io import iter_ndjson, write_ndjson
+from meili_tasks import task_uid, wait_for_tasks
+from mock_meili import MockMeilisearch
+from uploader import IndexUploader, encode_document
+
+
+def synthetic_documents(count, seed=42):
+    """Documents shaped like embeddings_2d records"""
+    rng = random.Random(seed)
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(2000)]
+    for i in range(count):
+        yield {
+            'id': i,
+            'term': ' '.join(rng.choices(words, k=rng.randint(1, 3))),
+            'description': ' '.join(rng.choices(words, k=rng.randint(10, 60))),
+            'x': rng.uniform(-1000, 1000),
+            'y': rng.uniform(-1000, 1000),
+        }
+
+
+def run_case(server, path, label, **uploader_options):
+    uploader = IndexUploader(server.url, 'bench', **uploader_options)
+    start = time.perf_counter()
+    tasks, stats = uploader.upload(encode_document(doc) for doc in iter_ndjson(path))
+    wait_for_tasks(uploader, [task_uid(task) for task in tasks], initial_interval=0.01)
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(stats['upload_latencies'])
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    print(f"  {label:<42} {stats['documents'] / elapsed:>10,.0f} docs/s  {elapsed:>6.2f}s  "
+          f"{stats['batches']:>4} batches  {stats['sent_bytes'] / 1e6:>6.1f} MB sent  p50 {p50:>5.0f} ms")
+    return stats['documents'] / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the batch uploader against a local Meilisearch stand-in")
+    parser.add_argument('--docs', type=int, default=50000)
+    parser.add_argument('--latency', type=float, default=0.02, help="Simulated per-request server latency in seconds")
+    parser.add_argument('--task-delay', type=float, default=0.05, help="Simulated indexing time per task in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.ndjson')
+        write_ndjson(path, synthetic_documents(args.docs))
+        size = os.path.getsize(path)
+        per_thousand = size / args.docs * 1000
+        print(f"{args.docs} documents, {size / 1e6:.1f} MB NDJSON, "
+              f"{args.latency * 1000:.0f} ms request latency, {args.task_delay * 1000:.0f} ms task delay\n")
+
+        with MockMeilisearch(request_latency=args.latency, task_delay=args.task_delay) as server:
+            baseline = run_case(server, path, "serial, ~1000 docs/batch, no gzip",
+                                max_in_flight=1, max_batch_bytes=int(per_thousand), gzip_level=0)
+            for batch_mb in (1, 8):
+                for in_flight in (1, 4, 8):
+                    for gzip_level in (0, 6):
+                        label = f"{in_flight} in flight, {batch_mb} MB batches, gzip {'on' if gzip_level else 'off'}"
+                        rate = run_case(server, path, label, max_in_flight=in_flight,
+                                        max_batch_bytes=batch_mb * 1024 * 1024, gzip_level=gzip_level)
+                        if in_flight == 8 and batch_mb == 8 and gzip_level:
+                            print(f"\n  Speed-up over serial baseline: {rate / baseline:.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import sys
+import tempfile
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Rows per pass; 256k x 3 float32 is ~3 MB of temporaries
+CHUNK_ROWS = 262144
+
+
+def iter_chunks(count, chunk_rows=CHUNK_ROWS):
+    """Yield (start, stop) row ranges covering count rows"""
+    for start in range(0, count, chunk_rows):
+        yield start, min(start + chunk_rows, count)
+
+
+def scratch_array(shape, dtype=np.float32):
+    """Disk-backed scratch array; the backing file is already unlinked"""
+    if shape[0] == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(tempfile.TemporaryFile(dir='.'), dtype=dtype, mode='w+', shape=shape)
+
+
+def to_scratch(array, chunk_rows=CHUNK_ROWS):
+    """Copy an array into a float32 scratch memmap one chunk at a time"""
+    out = scratch_array(array.shape)
+    for start, stop in iter_chunks(len(array), chunk_rows):
+        out[start:stop] = array[start:stop]
+    return out
+
+
+def transform_chunked(transform, vectors, indices, dims, chunk_rows=CHUNK_ROWS):
+    """Run transform over vectors[indices] in chunks, writing into a scratch memmap"""
+    out = scratch_array((len(indices), dims))
+    for start, stop in iter_chunks(len(indices), chunk_rows):
+        out[start:stop] = transform(vectors[indices[start:stop]])
+    return out
+
+
+def take_rows(source, indices, chunk_rows=CHUNK_ROWS):
+    """source[indices] gathered chunk by chunk into a scratch memmap"""
+    out = scratch_array((len(indices),) + source.shape[1:])
+    for start, stop in iter_chunks(len(indices), chunk_rows):
+        out[start:stop] = source[indices[start:stop]]
+    return out
+
+
+def column_min_max(array, chunk_rows=CHUNK_ROWS):
+    """Per-column minimum and maximum in one pass"""
+    mins = np.full(array.shape[1], np.inf)
+    maxs = np.full(array.shape[1], -np.inf)
+    for start, stop in iter_chunks(len(array), chunk_rows):
+        chunk = array[start:stop]
+        np.minimum(mins, chunk.min(axis=0), out=mins)
+        np.maximum(maxs, chunk.max(axis=0), out=maxs)
+    return mins, maxs
+
+
+def column_mean(array, chunk_rows=CHUNK_ROWS):
+    """Per-column mean with a float64 accumulator"""
+    total = np.zeros(array.shape[1])
+    for start, stop in iter_chunks(len(array), chunk_rows):
+        total += array[start:stop].sum(axis=0, dtype=np.float64)
+    return total / max(len(array), 1)
+
+
+def scale_columns_inplace(array, mins, maxs, scale, chunk_rows=CHUNK_ROWS):
+    """Map each column from [min, max] to [-scale/2, scale/2] in place"""
+    spans = np.asarray(maxs, dtype=np.float64) - np.asarray(mins, dtype=np.float64)
+    spans[spans == 0] = 1  # Avoid division by zero
+    factor = (scale / spans).astype(array.dtype)
+    offset = (np.asarray(mins) + spans / 2).astype(array.dtype)
+    for start, stop in iter_chunks(len(array), chunk_rows):
+        chunk = array[start:stop]
+        chunk -= offset
+        chunk *= factor
+    return array
+
+
+def project_to_sphere_inplace(array, center, radius, chunk_rows=CHUNK_ROWS):
+    """Center rows on `center` and scale each to length `radius`, in place"""
+    center = np.asarray(center, dtype=array.dtype)
+    for start, stop in iter_chunks(len(array), chunk_rows):
+        chunk = array[start:stop]
+        chunk -= center
+        norms = np.sqrt(np.einsum('ij,ij->i', chunk, chunk))[:, None]
+        norms[norms == 0] = 1  # Avoid division by zero
+        chunk *= radius / norms
+    return array
+
+
+def peak_memory_mb():
+    """Peak resident set size of this process in MB, or None if unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
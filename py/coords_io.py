@@ -0,0 +1,209 @@
+import json
+import os
+import struct
+import numpy as np
+from chunked import iter_chunks, scratch_array
+
+# Compact coordinate output for a layout prefix such as 'embeddings_2d':
+#   embeddings_2d.coords.bin  16-byte header ('CRD1', uint32 count, uint32 dims, uint32 0)
+#                             then float32 columns x[count], y[count][, z[count]], little-endian,
+#                             so the front end can wrap it in Float32Arrays without parsing
+#   embeddings_2d.ids.json    ids in row order, for keying the columns
+#   embeddings_2d.ndjson      one compact JSON record per line, for the indexers
+#   embeddings_2d.json        the original indented JSON list, an opt-in compatibility export
+#                             (py/1.js and py/3d.tsx read coords.bin and the NDJSON)
+COORDS_MAGIC = b'CRD1'
+COORDS_HEADER = struct.Struct('<4sIII')
+FORMATS = ('bin', 'ndjson', 'json')
+DEFAULT_FORMATS = ('bin', 'ndjson')
+WRITE_ORDER = ('json', 'bin', 'ndjson')
+
+# Records built and coordinates buffered per pass when streaming a layout out
+RECORD_CHUNK_ROWS = 65536
+
+
+def output_paths(prefix):
+    """Return {format: path} for a layout prefix"""
+    return {
+        'bin': prefix + '.coords.bin',
+        'ids': prefix + '.ids.json',
+        'ndjson': prefix + '.ndjson',
+        'json': prefix + '.json',
+    }
+
+
+class LayoutRecords:
+    """
+    Output records for a layout, built one row at a time from the item
+    metadata and a (count, dims) coordinate array (typically a scratch
+    memmap), so writing a layout never holds a second copy of every record.
+    """
+
+    def __init__(self, data, coords, axes, chunk_rows=RECORD_CHUNK_ROWS):
+        self.data = data
+        self.coords = coords
+        self.axes = axes
+        self.chunk_rows = chunk_rows
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        for start, stop in iter_chunks(len(self.data), self.chunk_rows):
+            block = np.asarray(self.coords[start:stop], dtype=np.float64)
+            for row in range(stop - start):
+                item = self.data[start + row]
+                record = {'id': item['id'], 'term': item['term'], 'description': item['description']}
+                for axis, name in enumerate(self.axes):
+                    record[name] = float(block[row, axis])
+                yield record
+
+
+def record_columns(records, axes):
+    """(count, dims) float32 scratch memmap of the records' coordinates"""
+    coords = scratch_array((len(records), len(axes)))
+    for row, record in enumerate(records):
+        coords[row] = [record[name] for name in axes]
+    return coords
+
+
+def write_coords_bin(path, ids_path, records, axes, chunk_rows=RECORD_CHUNK_ROWS):
+    """
+    Write float32 coordinate columns plus the id sidecar in one pass over
+    records; columns go straight into a memmap of the file chunk_rows at a time.
+    """
+    count = len(records)
+    with open(path, 'wb') as f:
+        f.write(COORDS_HEADER.pack(COORDS_MAGIC, count, len(axes), 0))
+        f.truncate(COORDS_HEADER.size + count * len(axes) * 4)
+
+    tmp_ids_path = ids_path + '.tmp'
+    with open(tmp_ids_path, 'w') as ids_file:
+        ids_file.write('[')
+        if count:
+            columns = np.memmap(path, dtype='<f4', mode='r+', offset=COORDS_HEADER.size, shape=(len(axes), count))
+            buffer = np.empty((len(axes), chunk_rows), dtype='<f4')
+            ids = []
+            start = 0
+            for row, record in enumerate(records):
+                for axis, name in enumerate(axes):
+                    buffer[axis, row - start] = record[name]
+                ids.append(record['id'])
+                if len(ids) == chunk_rows or row == count - 1:
+                    columns[:, start:row + 1] = buffer[:, :len(ids)]
+                    ids_file.write((',' if start else '') + json.dumps(ids, separators=(',', ':'))[1:-1])
+                    start = row + 1
+                    ids = []
+            columns.flush()
+            del columns
+        ids_file.write(']')
+    os.replace(tmp_ids_path, ids_path)
+
+
+def read_coords_bin(path, ids_path=None):
+    """
+    Map a coords.bin file without copying.
+
+    Returns (ids, columns) where columns is a (dims, count) float32 memmap;
+    ids is None when no sidecar path is given.
+    """
+    with open(path, 'rb') as f:
+        magic, count, dims, _ = COORDS_HEADER.unpack(f.read(COORDS_HEADER.size))
+    if magic != COORDS_MAGIC:
+        raise ValueError(f"{path} is not a coordinate file")
+
+    columns = np.memmap(path, dtype='<f4', mode='r', offset=COORDS_HEADER.size, shape=(dims, count))
+    ids = None
+    if ids_path is not None:
+        with open(ids_path, 'r') as f:
+            ids = json.load(f)
+    return ids, columns
+
+
+def write_json(path, records):
+    """Write the indented JSON list export one record at a time, byte-identical to json.dump(indent=2)"""
+    with open(path, 'w') as f:
+        f.write('[')
+        empty = True
+        for record in records:
+            f.write('\n  ' if empty else ',\n  ')
+            f.write(json.dumps(record, indent=2).replace('\n', '\n  '))
+            empty = False
+        f.write(']' if empty else '\n]')
+
+
+def write_ndjson(path, records):
+    """Write one compact JSON record per line"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False))
+            f.write('\n')
+
+
+def iter_ndjson(path):
+    """Stream records from an NDJSON file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_outputs(prefix, records, axes, formats=DEFAULT_FORMATS):
+    """
+    Write a layout in each requested format, returning {format: path}.
+
+    records is any sized, re-iterable sequence of dicts (a list, or a
+    LayoutRecords view); each writer makes its own single pass over it.
+    """
+    paths = output_paths(prefix)
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown output format '{fmt}', expected one of {FORMATS}")
+
+    # NDJSON goes last, so in a run writing both it's the newer file and
+    # records_source picks it over the JSON export
+    written = {}
+    for fmt in sorted(set(formats), key=WRITE_ORDER.index):
+        tmp_path = paths[fmt] + '.tmp'
+        if fmt == 'bin':
+            write_coords_bin(tmp_path, paths['ids'], records, axes)
+        elif fmt == 'ndjson':
+            write_ndjson(tmp_path, records)
+        else:
+            write_json(tmp_path, records)
+        os.replace(tmp_path, paths[fmt])
+        written[fmt] = paths[fmt]
+    return written
+
+
+def records_source(prefix):
+    """
+    ('ndjson' | 'json', path) of the newest full-record file for a layout,
+    or None. write_outputs writes NDJSON last; a JSON export newer than the
+    NDJSON (an older tool, or a run with NDJSON turned off) is the current one.
+    """
+    paths = output_paths(prefix)
+    candidates = [(os.path.getmtime(paths[fmt]), fmt == 'ndjson', fmt)
+                  for fmt in ('ndjson', 'json') if os.path.exists(paths[fmt])]
+    if not candidates:
+        return None
+    fmt = max(candidates)[2]
+    return fmt, paths[fmt]
+
+
+def load_records(prefix):
+    """Load the full records of a layout from the newest of NDJSON and the JSON export"""
+    records = iter_records(prefix)
+    return None if records is None else list(records)
+
+
+def iter_records(prefix):
+    """Stream the records of a layout from the newest of NDJSON and JSON; None if neither exists"""
+    source = records_source(prefix)
+    if source is None:
+        return None
+    fmt, path = source
+    if fmt == 'ndjson':
+        return iter_ndjson(path)
+    with open(path, 'r') as f:
+        return iter(json.load(f))
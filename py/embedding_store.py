@@ -0,0 +1,161 @@
+import json
+import os
+import numpy as np
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Binary layout for embeddings.json:
+#   embeddings.vectors.npy  float32 (n, dim) matrix, loaded with mmap
+#   embeddings.meta.json    columnar side table: {"id": [...], "term": [...], "description": [...]}
+VECTORS_SUFFIX = '.vectors.npy'
+META_SUFFIX = '.meta.json'
+META_FIELDS = ('id', 'term', 'description')
+
+READ_CHUNK_SIZE = 1 << 20
+GROWTH_FACTOR = 1.5
+
+
+def store_paths(prefix):
+    """Return (vectors_path, meta_path) for a store prefix"""
+    return prefix + VECTORS_SUFFIX, prefix + META_SUFFIX
+
+
+def store_is_fresh(json_path, prefix):
+    """True when the binary store exists and is newer than the JSON source"""
+    vectors_path, meta_path = store_paths(prefix)
+    if not (os.path.exists(vectors_path) and os.path.exists(meta_path)):
+        return False
+    if not os.path.exists(json_path):
+        return True
+    source_mtime = os.path.getmtime(json_path)
+    return min(os.path.getmtime(vectors_path), os.path.getmtime(meta_path)) >= source_mtime
+
+
+def iter_json_array(json_path, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield the items of a top-level JSON array one at a time.
+
+    Uses ijson when it is installed; otherwise decodes objects out of a
+    sliding text buffer so only one chunk plus one item is held in memory.
+    """
+    if ijson is not None:
+        with open(json_path, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+        return
+
+    decoder = json.JSONDecoder()
+    with open(json_path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f"{json_path} does not contain a JSON array")
+        pos = 1
+        eof = False
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == ']':
+                return
+
+            try:
+                if pos >= len(buffer):
+                    raise json.JSONDecodeError("Buffer exhausted", buffer, pos)
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+
+            yield item
+
+
+def read_embeddings_streaming(json_path='embeddings.json', chunk_size=READ_CHUNK_SIZE):
+    """
+    Stream embeddings.json into a float32 matrix and a compact metadata list.
+
+    The matrix is preallocated from an estimate based on the file size and
+    the first item, grown geometrically if the estimate was short, and
+    trimmed in place at the end, so peak memory stays close to the final
+    (n, dim) float32 matrix instead of the whole parsed document.
+    """
+    items = []
+    vectors = None
+    n = 0
+
+    for item in iter_json_array(json_path, chunk_size):
+        if vectors is None:
+            dim = len(item['vector'])
+            approx_item_bytes = len(json.dumps(item, separators=(',', ':')))
+            capacity = max(1, int(os.path.getsize(json_path) / approx_item_bytes * 1.1))
+            vectors = np.empty((capacity, dim), dtype=np.float32)
+        elif n == vectors.shape[0]:
+            vectors.resize((int(n * GROWTH_FACTOR) + 1, vectors.shape[1]), refcheck=False)
+
+        vectors[n] = item['vector']
+        items.append({field: item[field] for field in META_FIELDS})
+        n += 1
+
+    if vectors is None:
+        raise ValueError(f"{json_path} contains no embeddings")
+
+    vectors.resize((n, vectors.shape[1]), refcheck=False)
+    return items, vectors
+
+
+def convert_json_to_store(json_path='embeddings.json', prefix='embeddings'):
+    """One-time conversion of embeddings.json into the binary store"""
+    items, vectors = read_embeddings_streaming(json_path)
+
+    vectors_path, meta_path = store_paths(prefix)
+    np.save(vectors_path, vectors)
+    del vectors
+
+    meta = {field: [item[field] for item in items] for field in META_FIELDS}
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, separators=(',', ':'))
+
+    return vectors_path, meta_path
+
+
+def load_store(prefix='embeddings'):
+    """
+    Load the binary store zero-copy.
+
+    Returns (items, vectors) where items is a list of {id, term, description}
+    dicts and vectors is a read-only np.memmap of float32 rows.
+    """
+    vectors_path, meta_path = store_paths(prefix)
+    vectors = np.load(vectors_path, mmap_mode='r')
+
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    items = [dict(zip(META_FIELDS, row)) for row in zip(*(meta[field] for field in META_FIELDS))]
+
+    if len(items) != vectors.shape[0]:
+        raise ValueError(f"Store metadata has {len(items)} rows but vectors have {vectors.shape[0]}")
+    return items, vectors
+
+
+def load_embeddings(json_path='embeddings.json', prefix=None):
+    """Load embeddings through the binary store, converting the JSON once if needed"""
+    if prefix is None:
+        prefix = os.path.splitext(json_path)[0]
+    if not store_is_fresh(json_path, prefix):
+        print(f"Converting {json_path} to binary store (one-time)...")
+        convert_json_to_store(json_path, prefix)
+    return load_store(prefix)
+
+
+if __name__ == "__main__":
+    import sys
+
+    source = sys.argv[1] if len(sys.argv) > 1 else 'embeddings.json'
+    vectors_path, meta_path = convert_json_to_store(source, os.path.splitext(source)[0])
+    print(f"✓ Wrote {vectors_path} and {meta_path}")
@@ -0,0 +1,148 @@
+import hashlib
+import os
+import pickle
+from collections import namedtuple
+import numpy as np
+from coords_io import load_records
+
+# Refit from scratch once this fraction of the corpus the reducer was fitted
+# on is new, changed or removed, counted across all incremental runs since
+DRIFT_THRESHOLD = 0.1
+
+# Record fields copied into the layout output next to the coordinates
+RECORD_FIELDS = ('term', 'description')
+
+UpdatePlan = namedtuple("UpdatePlan", ["state", "indices", "relabel", "removed", "drift"])
+
+
+def vector_digest(vector):
+    """Short content hash of a vector, used to spot changed items by id"""
+    return hashlib.blake2b(np.ascontiguousarray(vector, dtype=np.float32).tobytes(), digest_size=8).hexdigest()
+
+
+def fields_digest(item):
+    """Short content hash of the record fields the output carries"""
+    h = hashlib.blake2b(digest_size=8)
+    for field in RECORD_FIELDS:
+        h.update(str(item.get(field, '')).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def save_reducer(path, reducer, data, vectors, params):
+    """
+    Persist a fitted reducer with its output normalization params and
+    per-id digests: of the vectors as fitted (kept until the next full
+    fit, to measure drift against), of the vectors as last placed, and of
+    the record fields as last written.
+    """
+    digests = {item['id']: vector_digest(vectors[i]) for i, item in enumerate(data)}
+    state = {
+        'reducer': reducer,
+        'fitted': dict(digests),
+        'digests': digests,
+        'fields': {item['id']: fields_digest(item) for item in data},
+        'params': params,
+    }
+    save_reducer_state(path, state)
+
+
+def load_reducer(path):
+    """Load a persisted reducer state, or None if there isn't one"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def load_output(output_prefix):
+    """Load an existing layout's records as {id: record}"""
+    records = load_records(output_prefix)
+    if records is None:
+        return None
+    return {item['id']: item for item in records}
+
+
+def plan_update(reducer_path, existing, data, vectors, drift_threshold=DRIFT_THRESHOLD):
+    """
+    Decide whether an incremental transform is possible.
+
+    Returns an UpdatePlan listing the rows of `data` that need new
+    coordinates and the rows whose vector is unchanged but whose record
+    fields changed, or None when a full refit is required: no saved
+    reducer, no existing output, or drift above `drift_threshold`.
+
+    Drift compares the current vectors with those the reducer was fitted
+    on, not with the previous run, so a series of small updates still
+    adds up to a refit.
+    """
+    state = load_reducer(reducer_path)
+    if state is None or existing is None:
+        return None
+
+    digests = state['digests']
+    fitted = state.get('fitted', digests)   # states from before 'fitted' was kept
+    fields = state.get('fields', {})
+    current_ids = set()
+    indices = []
+    relabel = []
+    drifted = 0
+    for i, item in enumerate(data):
+        item_id = item['id']
+        current_ids.add(item_id)
+        digest = vector_digest(vectors[i])
+        if fitted.get(item_id) != digest:
+            drifted += 1
+        if item_id not in existing or digests.get(item_id) != digest:
+            indices.append(i)
+        elif fields.get(item_id) != fields_digest(item):
+            relabel.append(i)
+
+    removed = [item_id for item_id in existing if item_id not in current_ids]
+    drifted += sum(1 for item_id in fitted if item_id not in current_ids)
+    drift = drifted / max(len(fitted), 1)
+    if drift > drift_threshold:
+        return None
+
+    return UpdatePlan(state, np.array(indices, dtype=np.int64), relabel, removed, drift)
+
+
+def merge_coordinates(existing, data, indices, coords, axes, relabel=()):
+    """
+    Merge new coordinates into existing records, in the order of `data`;
+    rows in `relabel` keep their coordinates and take the new record fields.
+    """
+    for row, i in enumerate(indices):
+        item = data[i]
+        record = {'id': item['id'], 'term': item['term'], 'description': item['description']}
+        for axis, name in enumerate(axes):
+            record[name] = float(coords[row, axis])
+        existing[item['id']] = record
+    for i in relabel:
+        item = data[i]
+        existing[item['id']] = dict(existing[item['id']], **{field: item[field] for field in RECORD_FIELDS})
+    return [existing[item['id']] for item in data]
+
+
+def record_update(reducer_path, plan, data, vectors):
+    """Store digests for the rows just transformed or relabelled and forget removed ids"""
+    state = plan.state
+    state.setdefault('fitted', dict(state['digests']))
+    fields = state.setdefault('fields', {})
+    for i in plan.indices:
+        state['digests'][data[i]['id']] = vector_digest(vectors[i])
+        fields[data[i]['id']] = fields_digest(data[i])
+    for i in plan.relabel:
+        fields[data[i]['id']] = fields_digest(data[i])
+    for item_id in plan.removed:
+        state['digests'].pop(item_id, None)
+        fields.pop(item_id, None)
+    save_reducer_state(reducer_path, state)
+
+
+def save_reducer_state(path, state):
+    """Rewrite an already-built reducer state"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
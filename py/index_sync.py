@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import time
+from meili_tasks import indexing_report, task_uid, wait_for_tasks
+from uploader import encode_document
+
+MANIFEST_SUFFIX = '.sync_manifest.json'
+DELETE_BATCH_SIZE = 10000
+
+
+def content_hash(value):
+    """Stable hash of a JSON-serializable value"""
+    return line_hash(encode_document(value))
+
+
+def line_hash(line):
+    return hashlib.blake2b(line, digest_size=12).hexdigest()
+
+
+def manifest_path_for(index_name):
+    return index_name + MANIFEST_SUFFIX
+
+
+def load_manifest(path):
+    """Local record of what the index holds: settings hash and id -> document hash"""
+    if not os.path.exists(path):
+        return {'settings_hash': None, 'documents': {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def indexed_document_count(uploader):
+    """Documents the server currently holds, or 0 if the index doesn't exist yet"""
+    try:
+        return uploader.get_stats()['numberOfDocuments']
+    except Exception:
+        return 0
+
+
+def sync_index(uploader, documents, settings, manifest_path, full=False):
+    """
+    Bring an index in line with `documents` by pushing only the difference.
+
+    `documents` may be any iterable and is consumed once: each document is
+    encoded and hashed, and only new or changed ones are streamed to the
+    uploader. Ids in the manifest that were not seen are deleted.
+
+    Settings are applied only when their hash changed, since a settings
+    update can trigger a full reindex server-side. If the server's
+    document count disagrees with the manifest (index deleted or edited
+    elsewhere) the manifest is discarded and everything is re-pushed.
+    The manifest is saved only after every task succeeded; pass
+    manifest_path=None for an index that does not outlive the process
+    (local_search.LocalSearchIndex). Raises TaskFailed from meili_tasks if
+    any task fails.
+    """
+    manifest = load_manifest(manifest_path) if manifest_path else None
+    if full or manifest is None:
+        manifest = {'settings_hash': None, 'documents': {}}
+    elif manifest['documents'] and indexed_document_count(uploader) != len(manifest['documents']):
+        print("  Index no longer matches the sync manifest, re-pushing all documents")
+        manifest = {'settings_hash': None, 'documents': {}}
+
+    settings_hash = content_hash(settings)
+    if manifest['settings_hash'] != settings_hash:
+        print("Configuring index settings...")
+        wait_for_tasks(uploader, [task_uid(uploader.update_settings(settings))])
+        print("✓ Index settings configured")
+    else:
+        print("✓ Index settings unchanged, skipping update_settings")
+
+    previous = manifest['documents']
+    hashes = {}
+
+    def changed_lines():
+        for doc in documents:
+            line = encode_document(doc)
+            key = str(doc['id'])
+            hashes[key] = line_hash(line)
+            if previous.get(key) != hashes[key]:
+                yield line
+
+    print("\nStreaming added/changed documents...")
+    start = time.perf_counter()
+    tasks, upload_stats = uploader.upload(
+        changed_lines(),
+        on_batch=lambda n, task: print(f"  Batch {n} queued (task ID: {task_uid(task)})"),
+    )
+    task_uids = [task_uid(task) for task in tasks]
+
+    removed = [key for key in previous if key not in hashes]
+    for i in range(0, len(removed), DELETE_BATCH_SIZE):
+        task_uids.append(task_uid(uploader.delete_documents(removed[i:i + DELETE_BATCH_SIZE])))
+        print(f"  Deletion of {len(removed[i:i + DELETE_BATCH_SIZE])} documents queued (task ID: {task_uids[-1]})")
+
+    print(f"\nSynced {len(hashes)} documents: {upload_stats['documents']} added/changed, "
+          f"{len(removed)} removed, {len(hashes) - upload_stats['documents']} unchanged")
+    if upload_stats['batches']:
+        print(f"  Uploaded {upload_stats['raw_bytes'] / 1e6:.1f} MB as {upload_stats['sent_bytes'] / 1e6:.1f} MB "
+              f"in {upload_stats['batches']} batches ({upload_stats['seconds']:.2f}s)")
+
+    if task_uids:
+        print("\nWaiting for indexing to complete...")
+    finished = wait_for_tasks(uploader, task_uids)
+
+    elapsed = time.perf_counter() - start
+
+    if manifest_path:
+        save_manifest(manifest_path, {'settings_hash': settings_hash, 'documents': hashes})
+    return indexing_report(finished.values(), upload_stats['documents'] + len(removed), elapsed)
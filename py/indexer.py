@@ -0,0 +1,188 @@
+import argparse
+import json
+import requests
+from coords_io import iter_records
+from index_sync import manifest_path_for, sync_index
+from local_search import LocalSearchIndex, saved_path_for
+from meili_tasks import TaskFailed, print_indexing_report
+from uploader import GZIP_LEVEL, MAX_BATCH_BYTES, MAX_IN_FLIGHT, RETRIES, IndexUploader
+
+MEILISEARCH_URL = 'http://localhost:7700'
+TEST_QUERIES = ["data", "algorithm", "neural"]
+
+TYPO_TOLERANCE = {
+    'enabled': True,
+    'minWordSizeForTypos': {
+        'oneTypo': 5,
+        'twoTypos': 9
+    }
+}
+
+RANKING_RULES = [
+    'words',
+    'typo',
+    'proximity',
+    'attribute',
+    'sort',
+    'exactness'
+]
+
+# Settings profiles: index settings plus the coordinate fields shown in test searches
+PROFILES = {
+    '2d': {
+        'settings': {
+            'searchableAttributes': ['term', 'description'],
+            'displayedAttributes': ['id', 'term', 'description', 'x', 'y'],
+            'filterableAttributes': ['id'],
+            'sortableAttributes': [],
+            'rankingRules': RANKING_RULES,
+            'stopWords': [],
+            'synonyms': {},
+            'distinctAttribute': None,
+            'typoTolerance': TYPO_TOLERANCE,
+            'faceting': {'maxValuesPerFacet': 100},
+            'pagination': {'maxTotalHits': 1000},
+        },
+        'show': (),
+    },
+    '3d': {
+        'settings': {
+            'searchableAttributes': ['term', 'description'],
+            'displayedAttributes': ['id', 'term', 'description', 'x', 'y', 'z',
+                                    'x_internal', 'y_internal', 'z_internal'],
+            'filterableAttributes': ['id'],
+            'sortableAttributes': [],
+            'rankingRules': RANKING_RULES,
+            'typoTolerance': TYPO_TOLERANCE,
+        },
+        'show': ('x', 'y', 'z'),
+    },
+}
+
+
+def run_test_searches(uploader, show=(), queries=TEST_QUERIES):
+    print("\n--- Testing Search ---")
+    for query in queries:
+        results = uploader.search(query, {'limit': 3})
+        print(f"\nQuery: '{query}' → {results['estimatedTotalHits']} results")
+        for hit in results['hits'][:2]:
+            coords = ', '.join(f"{axis}:{hit[axis]:.1f}" for axis in show if axis in hit)
+            print(f"  • {hit['term']}" + (f" ({coords})" if coords else ""))
+
+
+def index_dataset(dataset, index_name, profile, url=MEILISEARCH_URL, api_key=None, full=False,
+                  max_batch_bytes=MAX_BATCH_BYTES, max_in_flight=MAX_IN_FLIGHT, gzip_level=GZIP_LEVEL,
+                  retries=RETRIES, test_searches=True, fallback=True, local=False):
+    """
+    Sync one coordinate dataset into a Meilisearch index.
+
+    `dataset` is a layout prefix such as 'embeddings_2d' (read from its
+    .ndjson, falling back to .json); `profile` is a PROFILES entry. If the
+    server is unreachable and `fallback` is set, or `local` is set, the
+    dataset goes into an in-process LocalSearchIndex instead, which is
+    saved to <index_name>.local.json for local_search.py to search.
+    Returns the indexing report, or None if the run could not complete.
+    """
+    uploader = None
+    if not local:
+        print(f"Connecting to Meilisearch at {url}...")
+        uploader = IndexUploader(url, index_name, api_key=api_key, max_batch_bytes=max_batch_bytes,
+                                 max_in_flight=max_in_flight, gzip_level=gzip_level, retries=retries)
+        try:
+            health = uploader.health()
+            print(f"✓ Meilisearch is healthy: {health}")
+        except Exception as e:
+            print(f"✗ Cannot connect to Meilisearch: {e}")
+            print("Make sure Docker container is running:")
+            print("  docker run -d -p 7700:7700 getmeili/meilisearch:latest")
+            if not fallback:
+                return None
+            uploader = None
+
+    if uploader is None:
+        print("Using the in-process local search index")
+        uploader = LocalSearchIndex(index_name)
+
+    print(f"\nLoading {dataset}...")
+    documents = iter_records(dataset)
+    if documents is None:
+        print(f"✗ {dataset}.ndjson / {dataset}.json not found")
+        print("Run reduce_pipeline.py first to generate the file")
+        return None
+
+    print(f"\nSyncing index '{index_name}'...")
+    try:
+        manifest_path = None if isinstance(uploader, LocalSearchIndex) else manifest_path_for(index_name)
+        report = sync_index(uploader, documents, profile['settings'], manifest_path, full=full)
+    except (TaskFailed, TimeoutError, requests.RequestException) as e:
+        print(f"✗ Indexing failed: {e}")
+        return None
+    print_indexing_report(report)
+    if isinstance(uploader, LocalSearchIndex):
+        uploader.save(saved_path_for(index_name))
+        print(f"✓ Saved local index to {saved_path_for(index_name)}")
+
+    stats = uploader.get_stats()
+    print(f"\n✓ Indexing complete!")
+    print(f"  Total documents: {stats['numberOfDocuments']}")
+
+    if test_searches:
+        run_test_searches(uploader, profile['show'])
+
+    print("\n" + "="*60)
+    print("✓ Setup complete!")
+    print("="*60)
+    if isinstance(uploader, LocalSearchIndex):
+        print(f"Local search: python local_search.py {index_name} <query>")
+    else:
+        print(f"Meilisearch UI: {url}")
+        print(f"API endpoint: {url}")
+    print(f"Index name: {index_name}")
+    print(f"Total nodes: {stats['numberOfDocuments']}")
+    print("="*60)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync a coordinate dataset into a Meilisearch index")
+    parser.add_argument('--dataset', required=True, help="Layout prefix, e.g. embeddings_2d")
+    parser.add_argument('--index', required=True, help="Meilisearch index name")
+    parser.add_argument('--profile', default='2d', help=f"Settings profile: {', '.join(PROFILES)} or a JSON file (default: %(default)s)")
+    parser.add_argument('--url', default=MEILISEARCH_URL, help="Meilisearch URL (default: %(default)s)")
+    parser.add_argument('--api-key', help="Meilisearch API key")
+    parser.add_argument('--full', action='store_true', help="Ignore the sync manifest and re-push every document")
+    parser.add_argument('--batch-mb', type=float, default=MAX_BATCH_BYTES / 1024 / 1024, help="Max upload batch size in MB (default: %(default)s)")
+    parser.add_argument('--in-flight', type=int, default=MAX_IN_FLIGHT, help="Concurrent upload requests (default: %(default)s)")
+    parser.add_argument('--gzip-level', type=int, default=GZIP_LEVEL, help="gzip level for request bodies, 0 to disable (default: %(default)s)")
+    parser.add_argument('--retries', type=int, default=RETRIES, help="Retries for transient HTTP failures (default: %(default)s)")
+    parser.add_argument('--no-test-search', action='store_true', help="Skip the test queries after indexing")
+    parser.add_argument('--local', action='store_true', help="Index in-process with local_search instead of Meilisearch")
+    parser.add_argument('--no-fallback', action='store_true', help="Abort instead of falling back to local search when Meilisearch is down")
+    args = parser.parse_args(argv)
+    if args.in_flight < 1:
+        parser.error("--in-flight must be at least 1")
+
+    if args.profile in PROFILES:
+        profile = PROFILES[args.profile]
+    else:
+        # A JSON file holding {"settings": {...}, "show": [...]}
+        with open(args.profile, 'r') as f:
+            profile = dict({'show': ()}, **json.load(f))
+
+    index_dataset(
+        args.dataset, args.index, profile,
+        url=args.url,
+        api_key=args.api_key,
+        full=args.full,
+        max_batch_bytes=int(args.batch_mb * 1024 * 1024),
+        max_in_flight=args.in_flight,
+        gzip_level=args.gzip_level,
+        retries=args.retries,
+        test_searches=not args.no_test_search,
+        fallback=not args.no_fallback,
+        local=args.local,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+import argparse
+import bisect
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from coords_io import iter_records
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+DEFAULT_LIMIT = 20
+SAVED_SUFFIX = '.local.json'
+
+DEFAULT_SETTINGS = {
+    'searchableAttributes': ['term', 'description'],
+    'displayedAttributes': ['*'],
+    'typoTolerance': {'enabled': True, 'minWordSizeForTypos': {'oneTypo': 5, 'twoTypos': 9}},
+    'pagination': {'maxTotalHits': 1000},
+}
+
+
+def saved_path_for(index_uid):
+    return index_uid + SAVED_SUFFIX
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+
+def deletions(word, max_distance):
+    """Every string reachable from word by deleting up to max_distance characters"""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        results |= frontier
+    return results
+
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein (adjacent transpositions) distance, or limit + 1 if above limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = ca != cb
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class LocalSearchIndex:
+    """
+    In-process stand-in for a Meilisearch index, for when no server is up.
+
+    Terms from the searchable attributes go into a sorted vocabulary, which
+    acts as a flattened trie: the last query word matches every term it is
+    a prefix of via bisect. Typo tolerance follows minWordSizeForTypos using
+    a deletion-neighborhood index (built on first use) verified with a
+    bounded edit distance. Hits are ranked like Meilisearch's default
+    rules, reduced to words, typo, attribute and exactness.
+
+    Implements the methods sync_index and the indexer use on IndexUploader,
+    so it can be swapped in unchanged. Tasks complete synchronously.
+    """
+
+    def __init__(self, index_uid='local', settings=None):
+        self.index_uid = index_uid
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.documents = {}
+        self.postings = defaultdict(dict)   # term -> {doc_id: best attribute rank}
+        self.vocabulary = []
+        self.deletion_index = None
+        self.dirty = False
+        self.tasks = 0
+        if settings:
+            self.update_settings(settings)
+
+    # --- Persistence ---
+
+    def save(self, path):
+        """Write settings and documents as JSON; the term index is rebuilt on load"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'index_uid': self.index_uid, 'settings': self.settings,
+                       'documents': list(self.documents.values())}, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        index = cls(saved['index_uid'], saved['settings'])
+        index.add_documents(saved['documents'])
+        return index
+
+    # --- IndexUploader interface ---
+
+    def _task(self, task_type):
+        self.tasks += 1
+        return {'taskUid': self.tasks, 'indexUid': self.index_uid, 'status': 'enqueued', 'type': task_type}
+
+    def health(self):
+        return {'status': 'available'}
+
+    def get_task(self, uid):
+        return {'uid': uid, 'status': 'succeeded', 'duration': 'PT0S', 'error': None}
+
+    def get_stats(self):
+        return {'numberOfDocuments': len(self.documents), 'isIndexing': False}
+
+    def update_settings(self, settings):
+        self.settings.update(settings)
+        if self.documents:
+            self._reindex()
+        return self._task('settingsUpdate')
+
+    def add_documents(self, documents):
+        for doc in documents:
+            doc_id = str(doc['id'])
+            if doc_id in self.documents:
+                self._unindex(doc_id)
+            self.documents[doc_id] = doc
+            self._index(doc_id, doc)
+        return self._task('documentAdditionOrUpdate')
+
+    def delete_documents(self, ids):
+        for doc_id in map(str, ids):
+            if doc_id in self.documents:
+                self._unindex(doc_id)
+                del self.documents[doc_id]
+        return self._task('documentDeletion')
+
+    def upload(self, lines, on_batch=None):
+        start = time.perf_counter()
+        size = 0
+        documents = []
+        for line in lines:
+            size += len(line) + 1
+            documents.append(json.loads(line))
+        task = self.add_documents(documents)
+        if on_batch and documents:
+            on_batch(1, task)
+        stats = {'documents': len(documents), 'raw_bytes': size, 'sent_bytes': size,
+                 'batches': 1 if documents else 0, 'upload_latencies': [],
+                 'seconds': time.perf_counter() - start}
+        return ([task] if documents else []), stats
+
+    # --- Term index ---
+
+    def _searchable(self):
+        attributes = self.settings.get('searchableAttributes') or ['*']
+        return None if attributes == ['*'] else attributes
+
+    def _index(self, doc_id, doc):
+        attributes = self._searchable() or [key for key in doc if key != 'id']
+        for rank, attribute in enumerate(attributes):
+            for token in tokenize(doc.get(attribute, '')):
+                postings = self.postings[token]
+                if rank < postings.get(doc_id, len(attributes)):
+                    postings[doc_id] = rank
+        self.dirty = True
+
+    def _unindex(self, doc_id):
+        doc = self.documents[doc_id]
+        attributes = self._searchable() or [key for key in doc if key != 'id']
+        for attribute in attributes:
+            for token in tokenize(doc.get(attribute, '')):
+                postings = self.postings.get(token)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self.postings[token]
+        self.dirty = True
+
+    def _reindex(self):
+        self.postings = defaultdict(dict)
+        for doc_id, doc in self.documents.items():
+            self._index(doc_id, doc)
+
+    def _refresh(self):
+        if self.dirty:
+            self.vocabulary = sorted(self.postings)
+            self.deletion_index = None
+            self.dirty = False
+
+    def _typo_budget(self, word):
+        typo = self.settings.get('typoTolerance') or {}
+        if not typo.get('enabled', True):
+            return 0
+        sizes = typo.get('minWordSizeForTypos', {})
+        if len(word) >= sizes.get('twoTypos', 9):
+            return 2
+        if len(word) >= sizes.get('oneTypo', 5):
+            return 1
+        return 0
+
+    def _typo_candidates(self, word, budget):
+        if self.deletion_index is None:
+            self.deletion_index = defaultdict(set)
+            for term in self.vocabulary:
+                if self._typo_budget(term) or len(term) >= 3:
+                    for variant in deletions(term, 2):
+                        self.deletion_index[variant].add(term)
+
+        found = {}
+        for variant in deletions(word, budget):
+            for term in self.deletion_index.get(variant, ()):
+                if term not in found:
+                    distance = edit_distance(word, term, budget)
+                    if distance <= budget:
+                        found[term] = distance
+        return found
+
+    def _match_word(self, word, is_last):
+        """{term: (typos, exact)} for one query word"""
+        matches = {}
+        if word in self.postings:
+            matches[word] = (0, True)
+        if is_last:
+            start = bisect.bisect_left(self.vocabulary, word)
+            for term in self.vocabulary[start:]:
+                if not term.startswith(word):
+                    break
+                matches.setdefault(term, (0, False))
+        budget = self._typo_budget(word)
+        if budget:
+            for term, typos in self._typo_candidates(word, budget).items():
+                if typos and term not in matches:
+                    matches[term] = (typos, False)
+        return matches
+
+    # --- Search ---
+
+    def search(self, query, options=None):
+        options = options or {}
+        start = time.perf_counter()
+        self._refresh()
+
+        limit = options.get('limit', DEFAULT_LIMIT)
+        offset = options.get('offset', 0)
+        words = tokenize(query or '')
+
+        if not words:
+            ranked = list(self.documents)
+        else:
+            # doc_id -> [words matched, typos, best attribute, exact words]
+            scores = {}
+            for position, word in enumerate(words):
+                best = {}
+                for term, (typos, exact) in self._match_word(word, position == len(words) - 1).items():
+                    for doc_id, rank in self.postings[term].items():
+                        candidate = (typos, rank, not exact)
+                        if doc_id not in best or candidate < best[doc_id]:
+                            best[doc_id] = candidate
+                for doc_id, (typos, rank, inexact) in best.items():
+                    score = scores.setdefault(doc_id, [0, 0, rank, 0])
+                    score[0] += 1
+                    score[1] += typos
+                    score[2] = min(score[2], rank)
+                    score[3] += not inexact
+            ranked = sorted(scores, key=lambda d: (-scores[d][0], scores[d][1], scores[d][2], -scores[d][3]))
+
+        max_hits = (self.settings.get('pagination') or {}).get('maxTotalHits', 1000)
+        ranked = ranked[:max_hits]
+        displayed = self.settings.get('displayedAttributes') or ['*']
+        hits = []
+        for doc_id in ranked[offset:offset + limit]:
+            doc = self.documents[doc_id]
+            hits.append(doc if displayed == ['*'] else {key: doc[key] for key in displayed if key in doc})
+
+        return {
+            'hits': hits,
+            'query': query,
+            'limit': limit,
+            'offset': offset,
+            'estimatedTotalHits': len(ranked),
+            'processingTimeMs': int((time.perf_counter() - start) * 1000),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search a coordinate dataset without a Meilisearch server")
+    parser.add_argument('dataset', help=f"Layout prefix, e.g. embeddings_2d, or an index name saved by indexer.py (<index>{SAVED_SUFFIX})")
+    parser.add_argument('query', nargs='+')
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    saved_path = args.dataset if args.dataset.endswith(SAVED_SUFFIX) else saved_path_for(args.dataset)
+    if os.path.exists(saved_path):
+        # Keeps the settings profile the indexer applied
+        index = LocalSearchIndex.load(saved_path)
+        source = saved_path
+    else:
+        documents = iter_records(args.dataset)
+        if documents is None:
+            print(f"✗ {saved_path}, {args.dataset}.ndjson and {args.dataset}.json not found")
+            return
+        index = LocalSearchIndex(args.dataset)
+        index.add_documents(documents)
+        source = args.dataset
+    print(f"✓ Indexed {index.get_stats()['numberOfDocuments']} documents from {source} in {time.perf_counter() - start:.2f}s")
+
+    for query in args.query:
+        results = index.search(query, {'limit': args.limit})
+        print(f"\nQuery: '{query}' → {results['estimatedTotalHits']} results ({results['processingTimeMs']} ms)")
+        for hit in results['hits']:
+            print(f"  • {hit.get('term', hit.get('id'))}")
+
+
+if __name__ == "__main__":
+    main()
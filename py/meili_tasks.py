@@ -0,0 +1,113 @@
+import re
+import time
+
+# Poll intervals for task completion: start fast, back off exponentially
+POLL_INITIAL_INTERVAL = 0.05
+POLL_MAX_INTERVAL = 2.0
+POLL_BACKOFF = 2.0
+TASK_TIMEOUT = 600
+
+FINISHED_STATUSES = ('succeeded', 'failed', 'canceled')
+
+DURATION_PATTERN = re.compile(r'P(?:(?P<days>[\d.]+)D)?(?:T(?:(?P<hours>[\d.]+)H)?(?:(?P<minutes>[\d.]+)M)?(?:(?P<seconds>[\d.]+)S)?)?')
+
+
+class TaskFailed(Exception):
+    """One or more Meilisearch tasks finished without succeeding"""
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+        details = ', '.join(f"{task_field(t, 'uid')}: {task_field(t, 'status')} ({task_error(t)})" for t in tasks)
+        super().__init__(f"{len(tasks)} task(s) failed: {details}")
+
+
+def task_field(task, key):
+    """Read a task field from either the dict or the model-object client API"""
+    if isinstance(task, dict):
+        return task.get(key)
+    snake = re.sub(r'(?<!^)(?=[A-Z])', '_', key).lower()
+    return getattr(task, snake, getattr(task, key, None))
+
+
+def task_uid(task_info):
+    """UID of a queued task (the response of add_documents, update_settings, ...)"""
+    uid = task_field(task_info, 'taskUid')
+    return uid if uid is not None else task_field(task_info, 'uid')
+
+
+def task_error(task):
+    error = task_field(task, 'error')
+    if not error:
+        return 'no error details'
+    return error.get('message', error) if isinstance(error, dict) else error
+
+
+def parse_duration(value):
+    """Seconds in an ISO 8601 duration such as 'PT1.25S', or None"""
+    if not value:
+        return None
+    match = DURATION_PATTERN.fullmatch(value)
+    if not match:
+        return None
+    parts = {name: float(amount) for name, amount in match.groupdict().items() if amount}
+    return (parts.get('days', 0) * 86400 + parts.get('hours', 0) * 3600
+            + parts.get('minutes', 0) * 60 + parts.get('seconds', 0))
+
+
+def wait_for_tasks(client, uids, timeout=TASK_TIMEOUT, initial_interval=POLL_INITIAL_INTERVAL,
+                   max_interval=POLL_MAX_INTERVAL, backoff=POLL_BACKOFF, raise_on_failure=True):
+    """
+    Block until every task in `uids` has finished.
+
+    Only tasks still pending are polled, with exponential backoff between
+    rounds. Returns {uid: task}; raises TaskFailed if any task failed or was
+    canceled (unless raise_on_failure is False) and TimeoutError if tasks
+    are still pending after `timeout` seconds.
+    """
+    pending = list(uids)
+    finished = {}
+    interval = initial_interval
+    deadline = time.monotonic() + timeout
+
+    while pending:
+        still_pending = []
+        for uid in pending:
+            task = client.get_task(uid)
+            if task_field(task, 'status') in FINISHED_STATUSES:
+                finished[uid] = task
+            else:
+                still_pending.append(uid)
+        pending = still_pending
+
+        if not pending:
+            break
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"{len(pending)} task(s) still pending after {timeout}s: {pending[:10]}")
+        time.sleep(interval)
+        interval = min(interval * backoff, max_interval)
+
+    failed = [task for task in finished.values() if task_field(task, 'status') != 'succeeded']
+    if failed and raise_on_failure:
+        raise TaskFailed(failed)
+    return finished
+
+
+def indexing_report(tasks, document_count, elapsed):
+    """Throughput and per-batch latency for a set of finished document tasks"""
+    durations = [d for d in (parse_duration(task_field(t, 'duration')) for t in tasks) if d is not None]
+    return {
+        'documents': document_count,
+        'seconds': elapsed,
+        'docs_per_second': document_count / elapsed if elapsed > 0 else float('inf'),
+        'batches': len(tasks),
+        'batch_latency_avg': sum(durations) / len(durations) if durations else None,
+        'batch_latency_max': max(durations) if durations else None,
+    }
+
+
+def print_indexing_report(report):
+    print(f"  Indexed {report['documents']} documents in {report['seconds']:.2f}s "
+          f"({report['docs_per_second']:,.0f} docs/s)")
+    if report['batch_latency_avg'] is not None:
+        print(f"  Batch latency: avg {report['batch_latency_avg'] * 1000:.0f} ms, "
+              f"max {report['batch_latency_max'] * 1000:.0f} ms over {report['batches']} batches")
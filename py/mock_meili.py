@@ -0,0 +1,161 @@
+import gzip
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A small in-process stand-in for the parts of the Meilisearch HTTP API the
+# indexers use, so uploads can be benchmarked and exercised offline.
+# Tasks finish `task_delay` seconds after they are enqueued; every write
+# request sleeps `request_latency` seconds first to mimic a remote server.
+
+
+class MockMeilisearch:
+    def __init__(self, host='127.0.0.1', port=0, request_latency=0.0, task_delay=0.0, fail_every=0):
+        self.request_latency = request_latency
+        self.task_delay = task_delay
+        self.fail_every = fail_every
+        self.indexes = {}
+        self.tasks = {}
+        self.requests = 0
+        self.bytes_received = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _index(self, uid):
+        return self.indexes.setdefault(uid, {'documents': {}, 'settings': {}})
+
+    def _enqueue(self, index_uid, task_type, apply):
+        """Record a task; apply() runs immediately, status flips after task_delay"""
+        with self.lock:
+            uid = len(self.tasks)
+            failed = bool(self.fail_every) and (uid + 1) % self.fail_every == 0
+            if not failed:
+                apply()
+            self.tasks[uid] = {
+                'uid': uid, 'indexUid': index_uid, 'type': task_type,
+                'status': 'failed' if failed else 'succeeded',
+                'error': {'message': 'mock failure'} if failed else None,
+                'ready_at': time.monotonic() + self.task_delay,
+                'duration': f'PT{self.task_delay:.6f}S',
+            }
+        return 202, {'taskUid': uid, 'indexUid': index_uid, 'status': 'enqueued', 'type': task_type}
+
+    def _get_task(self, uid):
+        task = self.tasks.get(uid)
+        if task is None:
+            return 404, {'message': f'Task `{uid}` not found.'}
+        public = {key: value for key, value in task.items() if key != 'ready_at'}
+        if time.monotonic() < task['ready_at']:
+            public.update(status='processing', error=None, duration=None)
+        return 200, public
+
+    def handle(self, method, path, body):
+        if self.request_latency and method != 'GET':
+            time.sleep(self.request_latency)
+
+        if path == '/health':
+            return 200, {'status': 'available'}
+
+        match = re.fullmatch(r'/tasks/(\d+)', path)
+        if match and method == 'GET':
+            return self._get_task(int(match.group(1)))
+
+        match = re.fullmatch(r'/indexes/([^/]+)(/.*)?', path)
+        if not match:
+            return 404, {'message': 'Not found'}
+        uid, rest = match.group(1), match.group(2) or ''
+
+        if rest == '/stats' and method == 'GET':
+            if uid not in self.indexes:
+                return 404, {'message': f'Index `{uid}` not found.'}
+            return 200, {'numberOfDocuments': len(self.indexes[uid]['documents']), 'isIndexing': False}
+
+        if rest == '/settings' and method == 'PATCH':
+            settings = json.loads(body or b'{}')
+            return self._enqueue(uid, 'settingsUpdate', lambda: self._index(uid)['settings'].update(settings))
+
+        if rest == '/documents' and method == 'POST':
+            text = body.decode('utf-8')
+            if text.lstrip().startswith('['):
+                documents = json.loads(text)
+            else:
+                documents = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+            def apply():
+                store = self._index(uid)['documents']
+                for doc in documents:
+                    store[str(doc['id'])] = doc
+            return self._enqueue(uid, 'documentAdditionOrUpdate', apply)
+
+        if rest == '/documents/delete-batch' and method == 'POST':
+            ids = [str(i) for i in json.loads(body)]
+
+            def apply():
+                store = self._index(uid)['documents']
+                for doc_id in ids:
+                    store.pop(doc_id, None)
+            return self._enqueue(uid, 'documentDeletion', apply)
+
+        if rest == '/search' and method == 'POST':
+            query = json.loads(body or b'{}')
+            terms = (query.get('q') or '').lower().split()
+            hits = [doc for doc in self.indexes.get(uid, {'documents': {}})['documents'].values()
+                    if all(any(term in str(value).lower() for value in doc.values()) for term in terms)]
+            limit = query.get('limit', 20)
+            return 200, {'hits': hits[:limit], 'estimatedTotalHits': len(hits), 'query': query.get('q', '')}
+
+        return 404, {'message': 'Not found'}
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _dispatch(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                with mock.lock:
+                    mock.requests += 1
+                    mock.bytes_received += len(body)
+                if self.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+
+                status, payload = mock.handle(self.command, self.path.split('?', 1)[0], body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = do_PUT = do_DELETE = _dispatch
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
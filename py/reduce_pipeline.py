@@ -0,0 +1,305 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+import numpy as np
+import umap
+from umap.umap_ import nearest_neighbors
+from sklearn.utils import check_random_state
+from chunked import (column_mean, column_min_max, iter_chunks, peak_memory_mb, project_to_sphere_inplace,
+                     scale_columns_inplace, scratch_array, take_rows, to_scratch, transform_chunked)
+from coords_io import DEFAULT_FORMATS, LayoutRecords, record_columns, write_outputs
+from embedding_store import load_embeddings
+from incremental import load_output, merge_coordinates, plan_update, record_update, save_reducer
+from sphere_layout import fibonacci_sphere, assign_to_sphere, spacing_stats, sphere_radius_for
+from vector_index import VectorIndex, build_index
+
+CONFIG_PATH = 'reduce_config.json'
+
+# Used when reduce_config.json is missing or leaves a key out
+DEFAULT_CONFIG = {
+    'input': 'embeddings.json',
+    'random_state': 42,
+    'drift_threshold': 0.1,
+    'knn': {
+        'n_neighbors': 15,       # Controls local vs global structure (5-50)
+        'metric': 'cosine',      # Good for embeddings
+        'cache': 'embeddings.knn.pkl',
+    },
+    'ann': {
+        'path': 'embeddings.ann.npz',  # vector_index graph over the raw embeddings
+    },
+    'layouts': {
+        '2d': {
+            'n_components': 2,
+            'min_dist': 0.1,     # Minimum distance between points (0.0-0.99)
+            'scale_factor': 2000,
+            'output': 'embeddings_2d',
+            'formats': list(DEFAULT_FORMATS),
+            'reducer': 'embeddings_2d.reducer.pkl',
+        },
+        '3d': {
+            'n_components': 3,
+            'min_dist': 0.1,     # Sphere assignment keeps local structure, no need to inflate
+            'output': 'embeddings_3d',
+            'formats': list(DEFAULT_FORMATS),
+            'reducer': 'embeddings_3d.reducer.pkl',
+        },
+    },
+}
+
+HASH_CHUNK_ROWS = 65536
+
+
+def load_config(path=CONFIG_PATH):
+    """Load the pipeline config, filling gaps from DEFAULT_CONFIG"""
+    def merge(base, override):
+        merged = dict(base)
+        for key, value in override.items():
+            merged[key] = merge(base[key], value) if isinstance(value, dict) and isinstance(base.get(key), dict) else value
+        return merged
+
+    if not os.path.exists(path):
+        return DEFAULT_CONFIG
+    with open(path, 'r') as f:
+        return merge(DEFAULT_CONFIG, json.load(f))
+
+
+def vectors_digest(vectors):
+    """Hash the vector matrix in row chunks so a memmap is never fully resident"""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(repr(vectors.shape).encode())
+    for start in range(0, vectors.shape[0], HASH_CHUNK_ROWS):
+        h.update(np.ascontiguousarray(vectors[start:start + HASH_CHUNK_ROWS], dtype=np.float32).tobytes())
+    return h.hexdigest()
+
+
+def shared_knn(vectors, knn_config, random_state):
+    """
+    Compute UMAP's approximate kNN graph once and cache it on disk.
+
+    The cache is keyed by the vectors' digest, n_neighbors and metric, and
+    holds the NNDescent search index too, so reducers built from it can
+    still transform new points.
+    """
+    key = {
+        'digest': vectors_digest(vectors),
+        'n_neighbors': knn_config['n_neighbors'],
+        'metric': knn_config['metric'],
+    }
+
+    cache_path = knn_config['cache']
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached['key'] == key:
+            print(f"✓ Reusing kNN graph from {cache_path}")
+            return cached['knn']
+
+    print(f"Computing {knn_config['n_neighbors']}-NN graph ({knn_config['metric']})...")
+    start = time.perf_counter()
+    knn = nearest_neighbors(
+        vectors,
+        n_neighbors=knn_config['n_neighbors'],
+        metric=knn_config['metric'],
+        metric_kwds={},
+        angular=False,
+        random_state=check_random_state(random_state),
+    )
+    print(f"✓ kNN graph built in {time.perf_counter() - start:.1f}s")
+
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump({'key': key, 'knn': knn}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    return knn
+
+
+def build_reducer(layout, config, knn):
+    """UMAP reducer for one layout, reusing the shared kNN graph"""
+    return umap.UMAP(
+        n_components=layout['n_components'],
+        n_neighbors=config['knn']['n_neighbors'],
+        min_dist=layout['min_dist'],
+        metric=config['knn']['metric'],
+        random_state=config['random_state'],
+        precomputed_knn=knn,
+    )
+
+
+# --- 2D layout ---
+# Coordinates arrive as float32 scratch memmaps and are rewritten in place
+# chunk by chunk, so no full-size temporaries are allocated.
+
+def normalize_2d(coords, params):
+    """Scale UMAP output to roughly -scale/2 to scale/2 using the fit-time ranges"""
+    mins = [params['x_min'], params['y_min']]
+    maxs = [params['x_max'], params['y_max']]
+    return scale_columns_inplace(coords, mins, maxs, params['scale_factor'])
+
+
+def place_2d(coords, layout):
+    """Normalize a fresh 2D fit, returning (coords, params)"""
+    mins, maxs = column_min_max(coords)
+    params = {
+        'x_min': float(mins[0]), 'x_max': float(maxs[0]),
+        'y_min': float(mins[1]), 'y_max': float(maxs[1]),
+        'scale_factor': layout['scale_factor'],
+    }
+    return normalize_2d(coords, params), params
+
+
+def place_new_2d(coords, params):
+    return normalize_2d(coords, params)
+
+
+def report_2d(coords):
+    mins, maxs = column_min_max(coords)
+    print(f"  X range: [{mins[0]:.2f}, {maxs[0]:.2f}]")
+    print(f"  Y range: [{mins[1]:.2f}, {maxs[1]:.2f}]")
+
+
+# --- 3D sphere layout ---
+
+def place_3d(coords, layout):
+    """Lay a fresh 3D fit out on a Fibonacci sphere, returning (coords, params)"""
+    sphere_radius = sphere_radius_for(len(coords))
+    print(f"Projecting points onto sphere surface (radius {sphere_radius:.2f})...")
+
+    # Match UMAP structure to fibonacci positions: each point takes the free
+    # slot closest to its direction from the layout center, so neighborhoods
+    # in the UMAP output stay neighborhoods on the sphere
+    fib_points = fibonacci_sphere(len(coords), radius=sphere_radius, dtype=np.float32,
+                                  out=scratch_array((len(coords), 3)))
+    final_positions = take_rows(fib_points, assign_to_sphere(coords, fib_points))
+
+    params = {'center': column_mean(coords).tolist(), 'sphere_radius': sphere_radius}
+    return final_positions, params
+
+
+def place_new_3d(coords, params):
+    """
+    Put newly transformed points straight onto the sphere along their
+    direction from the fit-time center; a refit restores even spacing.
+    """
+    return project_to_sphere_inplace(coords, params['center'], params['sphere_radius'])
+
+
+def report_3d(coords):
+    min_radius, sphere_radius = np.inf, 0.0
+    for start, stop in iter_chunks(len(coords)):
+        radii = np.linalg.norm(np.asarray(coords[start:stop], dtype=np.float64), axis=1)
+        min_radius, sphere_radius = min(min_radius, radii.min()), max(sphere_radius, radii.max())
+    mins, maxs = column_min_max(coords)
+
+    # Verify no overlapping (check minimum distances)
+    spacing = spacing_stats(coords)
+
+    print(f"  Minimum distance between points: {spacing['min_distance']:.2f}")
+    print(f"  Mean nearest-neighbor distance: {spacing['mean_nn_distance']:.2f}")
+    print(f"  Average distance between points (sampled): {spacing['avg_distance']:.2f} (uniform sphere: {4 * sphere_radius / 3:.2f})")
+    print(f"  Sphere radius: {sphere_radius:.2f}")
+    for axis, name in enumerate('XYZ'):
+        print(f"  {name} range: [{mins[axis]:.2f}, {maxs[axis]:.2f}]")
+    print(f"  All points on sphere surface: {bool(np.isclose(min_radius, sphere_radius))}")
+
+
+LAYOUT_HANDLERS = {
+    2: (place_2d, place_new_2d, ('x', 'y'), report_2d),
+    3: (place_3d, place_new_3d, ('x', 'y', 'z'), report_3d),
+}
+
+
+def run_layout(name, config, data, vectors, get_knn, refit=False, export_json=False):
+    """
+    Produce one layout, incrementally when the saved reducer allows it.
+
+    UMAP's fit needs the vectors and its kNN graph in memory. After a full
+    fit, placement, the output writers and the report work from float32
+    scratch memmaps in row chunks; an incremental update merges into the
+    existing records, which are loaded as dicts.
+    """
+    layout = config['layouts'][name]
+    place, place_new, axes, report = LAYOUT_HANDLERS[layout['n_components']]
+
+    existing = load_output(layout['output'])
+    plan = None if refit else plan_update(layout['reducer'], existing, data, vectors, config['drift_threshold'])
+
+    if plan is None:
+        print(f"\n[{name}] Running UMAP {layout['n_components']}D layout...")
+        reducer = build_reducer(layout, config, get_knn())
+        coords, params = place(to_scratch(reducer.fit_transform(vectors)), layout)
+        save_reducer(layout['reducer'], reducer, data, vectors, params)
+        output_data = LayoutRecords(data, coords, axes)
+    else:
+        print(f"\n[{name}] Transforming {len(plan.indices)} new/changed items with saved reducer "
+              f"(drift since last fit {plan.drift:.1%}, {len(plan.relabel)} relabelled, {len(plan.removed)} removed)...")
+        coords = transform_chunked(plan.state['reducer'].transform, vectors, plan.indices, len(axes))
+        if len(plan.indices):
+            coords = place_new(coords, plan.state['params'])
+        output_data = merge_coordinates(existing, data, plan.indices, coords, axes, plan.relabel)
+        record_update(layout['reducer'], plan, data, vectors)
+        coords = record_columns(output_data, axes)
+
+    # Save processed data
+    formats = list(layout['formats'])
+    if export_json and 'json' not in formats:
+        formats.append('json')
+    written = write_outputs(layout['output'], output_data, axes, formats)
+
+    print(f"✓ Saved {len(output_data)} items with {layout['n_components']}D coordinates to {', '.join(written.values())}")
+    report(coords)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Project embeddings to 2D/3D layouts with a shared UMAP kNN graph")
+    parser.add_argument('--config', default=CONFIG_PATH, help="Pipeline config (default: %(default)s)")
+    parser.add_argument('--layout', action='append', help="Layout name from the config; repeat for several (default: all)")
+    parser.add_argument('--refit', action='store_true', help="Refit UMAP on the full dataset")
+    parser.add_argument('--drift-threshold', type=float, help="Refit when more than this fraction of the fitted items changed since the last full fit")
+    parser.add_argument('--json', action='store_true', help="Also write the indented JSON export (off by default; the front ends read coords.bin and NDJSON)")
+    parser.add_argument('--ann', action='store_true', help="Also (re)build the vector similarity index from the kNN graph")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.drift_threshold is not None:
+        config = dict(config, drift_threshold=args.drift_threshold)
+
+    names = args.layout or list(config['layouts'])
+    unknown = [name for name in names if name not in config['layouts']]
+    if unknown:
+        parser.error(f"Unknown layout(s): {', '.join(unknown)}")
+
+    # Load embeddings from the binary store (converted from the JSON once)
+    data, vectors = load_embeddings(config['input'])
+    print(f"Loaded {len(data)} items")
+    print(f"Vector shape: {vectors.shape}")
+
+    # The kNN graph is only needed for full fits, and then only built once
+    knn = []
+
+    def get_knn():
+        if not knn:
+            knn.append(shared_knn(vectors, config['knn'], config['random_state']))
+        return knn[0]
+
+    for name in names:
+        run_layout(name, config, data, vectors, get_knn, refit=args.refit, export_json=args.json)
+
+    if args.ann:
+        digest = vectors_digest(vectors)
+        if VectorIndex.saved_digest(config['ann']['path']) == digest:
+            print(f"\n✓ Vector index {config['ann']['path']} is up to date")
+        else:
+            print("\nBuilding vector similarity index...")
+            build_index(config, data, vectors, get_knn(), config['ann']['path'], digest)
+
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"\nPeak memory: {peak:,.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from coords_io import iter_records, output_paths, read_coords_bin
+
+# Viewport index over a layout's coords.bin: a linear quadtree (2D) or
+# octree (3D). Points are quantized to BITS per axis and keyed by their
+# Morton code, so every tile at every level is one contiguous key range.
+#
+# Level of detail: each point gets a min_level, the coarsest level at
+# which it is among the TILE_CAPACITY highest-priority points of its tile
+# (priority is a fixed random rank). A query at zoom z returns the points
+# in the viewport with min_level <= z, so every visible tile shows at most
+# TILE_CAPACITY points per level and points never disappear when zooming
+# in. Points are stored sorted by (min_level, morton), which turns a
+# viewport query into a few searchsorted calls per level.
+#
+#   embeddings_2d.tiles.npz   sorted coordinates, source rows, keys and level offsets
+TILES_SUFFIX = '.tiles.npz'
+BITS = 16
+TILE_CAPACITY = 64
+LOD_BIAS = 2           # auto zoom: the viewport spans about 2**LOD_BIAS tiles per axis
+MAX_COVER_TILES = 512
+DEFAULT_LIMIT = 20000
+DEFAULT_PORT = 8765
+
+
+def tiles_path_for(prefix):
+    return prefix + TILES_SUFFIX
+
+
+def morton_codes(cells, bits=BITS):
+    """Interleave the bits of integer cell coordinates, shape (count, dims)"""
+    cells = cells.astype(np.uint64, copy=False)
+    dims = cells.shape[1]
+    codes = np.zeros(len(cells), dtype=np.uint64)
+    for bit in range(bits):
+        for axis in range(dims):
+            codes |= ((cells[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(bit * dims + axis)
+    return codes
+
+
+def lod_levels(codes, dims, capacity=TILE_CAPACITY, bits=BITS, seed=0):
+    """Coarsest level at which each point is among its tile's `capacity` highest priorities"""
+    count = len(codes)
+    priority = np.random.default_rng(seed).permutation(count)
+    levels = np.full(count, bits, dtype=np.uint8)
+    unassigned = np.ones(count, dtype=bool)
+    for level in range(bits + 1):
+        tiles = codes >> np.uint64(dims * (bits - level))
+        order = np.lexsort((priority, tiles))
+        sorted_tiles = tiles[order]
+        rank = np.arange(count) - np.searchsorted(sorted_tiles, sorted_tiles)
+        chosen = order[rank < capacity]
+        chosen = chosen[unassigned[chosen]]
+        levels[chosen] = level
+        unassigned[chosen] = False
+        if not unassigned.any():
+            break
+    return levels
+
+
+class TileIndex:
+    def __init__(self, coords, rows, codes, level_offsets, lo, hi, bits=BITS):
+        self.coords = coords                # (count, dims) float32, sorted by (level, code)
+        self.rows = rows                    # row of each point in coords.bin
+        self.codes = codes
+        self.level_offsets = level_offsets  # points of level l are [offsets[l], offsets[l + 1])
+        self.lo = lo
+        self.hi = hi
+        self.bits = bits
+        self.dims = coords.shape[1]
+        self.ids = None
+        self.terms = None
+
+    @property
+    def max_level(self):
+        return len(self.level_offsets) - 2
+
+    @classmethod
+    def build(cls, columns, capacity=TILE_CAPACITY, bits=BITS):
+        """Build from (dims, count) coordinate columns, e.g. read_coords_bin's memmap"""
+        points = np.ascontiguousarray(np.asarray(columns, dtype=np.float32).T)
+        lo = points.min(axis=0) if len(points) else np.zeros(points.shape[1], np.float32)
+        hi = points.max(axis=0) if len(points) else np.ones(points.shape[1], np.float32)
+        span = np.where(hi > lo, hi - lo, 1.0)
+        cells = np.clip((points - lo) / span * (1 << bits), 0, (1 << bits) - 1).astype(np.uint64)
+        codes = morton_codes(cells, bits)
+        levels = lod_levels(codes, points.shape[1], capacity, bits)
+
+        order = np.lexsort((codes, levels))
+        level_offsets = np.searchsorted(levels[order], np.arange(bits + 2)).astype(np.int64)
+        return cls(points[order], order.astype(np.int32), codes[order], level_offsets, lo, hi, bits)
+
+    def save(self, path, source_mtime=0.0):
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, coords=self.coords, rows=self.rows, codes=self.codes,
+                 level_offsets=self.level_offsets, lo=self.lo, hi=self.hi,
+                 bits=np.array(self.bits), source_mtime=np.array(source_mtime))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            return cls(saved['coords'], saved['rows'], saved['codes'], saved['level_offsets'],
+                       saved['lo'], saved['hi'], int(saved['bits']))
+
+    def auto_zoom(self, box_lo, box_hi):
+        """Zoom level at which the viewport spans about 2**LOD_BIAS tiles per axis"""
+        full = float(np.max(self.hi - self.lo)) or 1.0
+        view = max(float(np.max(np.asarray(box_hi) - np.asarray(box_lo))), full / (1 << self.bits))
+        return int(np.clip(math.floor(math.log2(full / view)) + LOD_BIAS, 0, self.max_level))
+
+    def _key_ranges(self, box_lo, box_hi, zoom):
+        """Sorted, merged [start, end) Morton ranges of the tiles covering a box"""
+        span = np.where(self.hi > self.lo, self.hi - self.lo, 1.0)
+        cell_lo = np.clip(((np.asarray(box_lo) - self.lo) / span * (1 << self.bits)).astype(np.int64), 0, (1 << self.bits) - 1)
+        cell_hi = np.clip(((np.asarray(box_hi) - self.lo) / span * (1 << self.bits)).astype(np.int64), 0, (1 << self.bits) - 1)
+
+        # Finest level (up to two below the zoom) whose covering tile count stays small
+        level = min(zoom + 2, self.bits)
+        while level > 0:
+            shift = self.bits - level
+            extent = np.prod((cell_hi >> shift) - (cell_lo >> shift) + 1)
+            if extent <= MAX_COVER_TILES:
+                break
+            level -= 1
+        shift = self.bits - level
+
+        axes = [np.arange(cell_lo[d] >> shift, (cell_hi[d] >> shift) + 1) for d in range(self.dims)]
+        tiles = np.stack([a.ravel() for a in np.meshgrid(*axes, indexing='ij')], axis=1)
+        prefixes = np.sort(morton_codes(tiles, level))
+        if not len(prefixes):
+            return prefixes, prefixes
+        tile_shift = np.uint64(self.dims * shift)
+        starts = prefixes << tile_shift
+        ends = (prefixes + np.uint64(1)) << tile_shift
+
+        # Merge tiles that are adjacent in key order
+        breaks = np.ones(len(starts), dtype=bool)
+        breaks[1:] = starts[1:] != ends[:-1]
+        return starts[breaks], ends[np.append(breaks[1:], True)]
+
+    def query(self, box_lo, box_hi, zoom=None, limit=DEFAULT_LIMIT):
+        """
+        Points inside the axis-aligned box [box_lo, box_hi] down to `zoom`.
+
+        Returns (indices, zoom, truncated); indices point into self.coords,
+        coarser levels first, cut at `limit`.
+        """
+        box_lo = np.asarray(box_lo, dtype=np.float32)
+        box_hi = np.asarray(box_hi, dtype=np.float32)
+        if zoom is None:
+            zoom = self.auto_zoom(box_lo, box_hi)
+        zoom = int(np.clip(zoom, 0, self.max_level))
+        starts, ends = self._key_ranges(box_lo, box_hi, zoom)
+
+        found = []
+        total = 0
+        cut = False
+        for level in range(zoom + 1):
+            first, last = self.level_offsets[level], self.level_offsets[level + 1]
+            if first == last:
+                continue
+            block = self.codes[first:last]
+            lo_idx = np.searchsorted(block, starts)
+            hi_idx = np.searchsorted(block, ends)
+            spans = [np.arange(a, b) for a, b in zip(lo_idx, hi_idx) if b > a]
+            if not spans:
+                continue
+            candidates = first + np.concatenate(spans)
+            points = self.coords[candidates]
+            inside = np.all((points >= box_lo) & (points <= box_hi), axis=1)
+            found.append(candidates[inside])
+            total += int(inside.sum())
+            if total >= limit:
+                cut = level < zoom
+                break
+
+        indices = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        return indices[:limit], zoom, cut or len(indices) > limit
+
+    def payload(self, indices, zoom, truncated, axes):
+        """Columnar JSON-ready response for a query"""
+        result = {'zoom': zoom, 'count': int(len(indices)), 'truncated': bool(truncated)}
+        rows = self.rows[indices]
+        if self.ids is not None:
+            result['id'] = [self.ids[row] for row in rows.tolist()]
+        if self.terms is not None:
+            result['term'] = [self.terms[row] for row in rows.tolist()]
+        for axis, name in enumerate(axes):
+            result[name] = [round(v, 3) for v in self.coords[indices, axis].tolist()]
+        return result
+
+
+def load_tile_index(prefix, capacity=TILE_CAPACITY, with_terms=True):
+    """Load the layout's tile index, rebuilding it when coords.bin is newer"""
+    paths = output_paths(prefix)
+    if not os.path.exists(paths['bin']):
+        raise FileNotFoundError(f"{paths['bin']} not found; run reduce_pipeline.py first")
+
+    tiles_path = tiles_path_for(prefix)
+    source_mtime = os.path.getmtime(paths['bin'])
+    index = None
+    if os.path.exists(tiles_path):
+        with np.load(tiles_path) as saved:
+            fresh = float(saved['source_mtime']) == source_mtime
+        if fresh:
+            index = TileIndex.load(tiles_path)
+
+    ids, columns = read_coords_bin(paths['bin'], paths['ids'] if os.path.exists(paths['ids']) else None)
+    if index is None:
+        start = time.perf_counter()
+        index = TileIndex.build(columns, capacity)
+        index.save(tiles_path, source_mtime)
+        print(f"✓ Built {prefix} tile index ({len(index.coords)} points, "
+              f"{index.max_level + 1} levels) in {time.perf_counter() - start:.2f}s → {tiles_path}")
+    index.ids = ids
+
+    if with_terms:
+        records = iter_records(prefix)
+        if records is not None:
+            index.terms = [record.get('term', '') for record in records]
+    return index
+
+
+def parse_box(text, dims):
+    values = [float(v) for v in text.split(',')]
+    if len(values) != 2 * dims:
+        raise ValueError(f"bbox needs {2 * dims} numbers (mins then maxs), got {len(values)}")
+    return values[:dims], values[dims:]
+
+
+def make_server(indexes, host='127.0.0.1', port=DEFAULT_PORT):
+    """
+    HTTP service over loaded tile indexes, keyed by layout prefix:
+
+      GET /layouts/<prefix>                  bounds, point count and zoom levels
+      GET /layouts/<prefix>/points?bbox=x0,y0,x1,y1[&zoom=z][&limit=n]
+    """
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [part for part in url.path.split('/') if part]
+            if len(parts) < 2 or parts[0] != 'layouts' or parts[1] not in indexes:
+                return self._send(404, {'message': 'Not found', 'layouts': list(indexes)})
+            index = indexes[parts[1]]
+            axes = 'xyz'[:index.dims]
+
+            if len(parts) == 2:
+                return self._send(200, {'count': len(index.coords), 'dims': index.dims,
+                                        'min': index.lo.tolist(), 'max': index.hi.tolist(),
+                                        'max_zoom': index.max_level})
+            if parts[2:] != ['points']:
+                return self._send(404, {'message': 'Not found'})
+
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                if 'bbox' in params:
+                    box_lo, box_hi = parse_box(params['bbox'], index.dims)
+                else:
+                    box_lo, box_hi = index.lo, index.hi
+                zoom = int(params['zoom']) if 'zoom' in params else None
+                limit = int(params.get('limit', DEFAULT_LIMIT))
+            except ValueError as e:
+                return self._send(400, {'message': str(e)})
+
+            with lock:
+                indices, zoom, truncated = index.query(box_lo, box_hi, zoom, limit)
+            self._send(200, index.payload(indices, zoom, truncated, axes))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Viewport queries with level-of-detail sampling over layout coordinates")
+    parser.add_argument('layouts', nargs='*', default=['embeddings_2d', 'embeddings_3d'], help="Layout prefixes (default: %(default)s)")
+    parser.add_argument('--bbox', help="Query the first layout: comma-separated mins then maxs")
+    parser.add_argument('--zoom', type=int, help="Zoom level (default: picked from the bbox size)")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    parser.add_argument('--capacity', type=int, default=TILE_CAPACITY, help="Points per tile per level (default: %(default)s)")
+    parser.add_argument('--serve', action='store_true', help="Serve the layouts over HTTP")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    indexes = {}
+    for prefix in args.layouts:
+        try:
+            indexes[prefix] = load_tile_index(prefix, args.capacity)
+        except FileNotFoundError as e:
+            print(f"✗ {e}")
+    if not indexes:
+        return
+
+    if args.bbox:
+        prefix = next(iter(indexes))
+        index = indexes[prefix]
+        box_lo, box_hi = parse_box(args.bbox, index.dims)
+        start = time.perf_counter()
+        indices, zoom, truncated = index.query(box_lo, box_hi, args.zoom, args.limit)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{prefix}: {len(indices)} points at zoom {zoom}{' (truncated)' if truncated else ''} in {elapsed:.2f} ms")
+
+    if args.serve:
+        server = make_server(indexes, port=args.port)
+        print(f"✓ Serving {', '.join(indexes)} at http://127.0.0.1:{args.port}/layouts/<prefix>/points?bbox=...")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
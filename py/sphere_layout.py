@@ -0,0 +1,252 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from chunked import column_mean, iter_chunks, project_to_sphere_inplace, scratch_array, to_scratch
+
+GOLDEN_ANGLE = np.pi * (3. - np.sqrt(5.))  # Golden angle in radians
+SPHERE_CHUNK_SIZE = 1_000_000
+DISTANCE_SAMPLE_PAIRS = 200_000
+SLOT_CANDIDATES = 8
+MAX_CANDIDATES = 64
+MAX_ROUNDS = 6
+QUERY_CHUNK_ROWS = 16384  # rows per candidate query; 16k x 64 candidates is ~16 MB of temporaries
+POINTS_PER_CELL = 64     # density grid resolution for equalize_directions
+EQUALIZE_PRIOR = 0.05    # share of each band spread uniformly, keeps empty cells passable
+
+
+def sphere_radius_for(count, min_area_per_point=100, min_radius=500):
+    """Calculate sphere radius based on number of points to avoid overlap"""
+    # Surface area of sphere = 4πr², each point gets min_area_per_point of it
+    total_surface_area = count * min_area_per_point
+    sphere_radius = np.sqrt(total_surface_area / (4 * np.pi))
+
+    # Ensure minimum radius for visibility
+    return max(float(sphere_radius), min_radius)
+
+
+def fibonacci_sphere(samples, radius=1.0, dtype=np.float64, chunk_size=SPHERE_CHUNK_SIZE, out=None):
+    """
+    Generate evenly distributed points on a sphere using the Fibonacci spiral.
+
+    Points are computed with NumPy one chunk of indices at a time and written
+    into `out` (allocated if not given, and may be a memmap), so only
+    chunk-sized temporaries exist regardless of `samples`.
+    """
+    if out is None:
+        out = np.empty((samples, 3), dtype=dtype)
+    elif out.shape != (samples, 3):
+        raise ValueError(f"out must have shape {(samples, 3)}, got {out.shape}")
+
+    denominator = float(max(samples - 1, 1))
+
+    for start in range(0, samples, chunk_size):
+        stop = min(start + chunk_size, samples)
+        i = np.arange(start, stop, dtype=np.float64)
+
+        y = 1 - (i / denominator) * 2        # y goes from 1 to -1
+        ring_radius = np.sqrt(1 - y * y)     # radius at y
+        theta = GOLDEN_ANGLE * i             # golden angle increment
+
+        chunk = out[start:stop]
+        chunk[:, 0] = np.cos(theta) * ring_radius * radius
+        chunk[:, 1] = y * radius
+        chunk[:, 2] = np.sin(theta) * ring_radius * radius
+
+    return out
+
+
+def unit_directions(coords):
+    """Center coordinates on their mean and scale each row to unit length (float32, chunked)"""
+    directions = to_scratch(coords)
+    return project_to_sphere_inplace(directions, column_mean(coords), 1.0)
+
+
+def polar_angles(directions):
+    """(z, phi) of unit vectors, with y as the pole axis like fibonacci_sphere"""
+    directions = np.asarray(directions, dtype=np.float64)
+    return directions[:, 1].copy(), np.arctan2(directions[:, 2], directions[:, 0])
+
+
+def from_polar(z, phi):
+    ring_radius = np.sqrt(np.clip(1 - z * z, 0, None))
+    return np.column_stack([np.cos(phi) * ring_radius, z, np.sin(phi) * ring_radius])
+
+
+def equalize_directions(directions, points_per_cell=POINTS_PER_CELL):
+    """
+    Warp unit directions towards a uniform density on the sphere, keeping
+    their order along both angles (a smoothed Knothe-Rosenblatt map).
+
+    z is replaced by its rank, which makes it uniform, and so makes equal z
+    steps cover equal area. phi is replaced by its CDF within the point's z
+    band, from a (bands x 2*bands) histogram with ~points_per_cell points
+    per cell; the CDF is interpolated between neighbouring bands so the map
+    has no seams. Clusters expand into the space they will take on the
+    sphere anyway, instead of all competing for the slots at their centre.
+    """
+    n = len(directions)
+    z, phi = polar_angles(directions)
+    rank = np.empty(n)
+    rank[np.argsort(z, kind='stable')] = np.arange(n)
+    t = (rank + 0.5) / n
+
+    bands = max(1, int(np.sqrt(n / (2 * points_per_cell))))
+    bins = 2 * bands
+    band = np.minimum((t * bands).astype(np.int64), bands - 1)
+    column = np.minimum(((phi + np.pi) / (2 * np.pi) * bins).astype(np.int64), bins - 1)
+    within = (phi + np.pi) / (2 * np.pi) * bins - column
+
+    histogram = np.zeros((bands, bins))
+    np.add.at(histogram, (band, column), 1)
+    histogram += histogram.sum(axis=1, keepdims=True) * (EQUALIZE_PRIOR / bins) + 1e-9
+    cdf = np.zeros((bands, bins + 1))
+    cdf[:, 1:] = np.cumsum(histogram, axis=1)
+    cdf /= cdf[:, -1:]
+
+    # Band centres sit at integer positions; blend the two nearest CDFs
+    position = t * bands - 0.5
+    lower = np.clip(np.floor(position).astype(np.int64), 0, bands - 1)
+    upper = np.minimum(lower + 1, bands - 1)
+    weight = np.clip(position - lower, 0, 1)
+
+    def band_cdf(b):
+        return cdf[b, column] + within * (cdf[b, column + 1] - cdf[b, column])
+
+    u = (1 - weight) * band_cdf(lower) + weight * band_cdf(upper)
+    return from_polar(2 * t - 1, u * 2 * np.pi - np.pi)
+
+
+def sort_assign(directions, slot_directions):
+    """
+    Match points to slots by rank: both are cut into equal-count z rows
+    (about sqrt(pi*n) per row, which makes row height and in-row spacing
+    about equal), then paired in phi order within each row. O(n log n) and
+    conflict-free, but coarser than nearest-slot matching.
+    """
+    n = len(directions)
+    rows = max(1, int(round(np.sqrt(n / np.pi))))
+
+    def row_major_order(vectors):
+        z, phi = polar_angles(vectors)
+        row = np.empty(n, dtype=np.int64)
+        row[np.argsort(z, kind='stable')] = np.arange(n) * rows // n
+        return np.lexsort((phi, row))
+
+    assignment = np.empty(n, dtype=np.int64)
+    assignment[row_major_order(directions)] = row_major_order(slot_directions)
+    return assignment
+
+
+def candidate_slots(slot_directions, free, directions, k, chunk_rows=QUERY_CHUNK_ROWS):
+    """
+    (dist, cand) tables of each direction's k nearest free slots, as scratch
+    memmaps filled one query chunk at a time; cand holds slot indices.
+    """
+    tree = cKDTree(slot_directions[free])
+    dist = scratch_array((len(directions), k), dtype=np.float64)
+    cand = scratch_array((len(directions), k), dtype=np.int64)
+    for start, stop in iter_chunks(len(directions), chunk_rows):
+        chunk_dist, chunk_cand = tree.query(directions[start:stop], k=k)
+        dist[start:stop] = chunk_dist.reshape(stop - start, k)
+        cand[start:stop] = free[chunk_cand.reshape(stop - start, k)]
+    return dist, cand
+
+
+def assign_to_sphere(coords, slots, k=SLOT_CANDIDATES, max_rounds=MAX_ROUNDS):
+    """
+    Match each point to a distinct sphere slot, keeping neighbors together.
+
+    Points are compared to slots by direction from the layout's center,
+    after equalize_directions has spread dense clusters to uniform density.
+    Each point proposes its k nearest free slots (cKDTree query) in order;
+    when several points propose the same slot, the closest one wins and
+    the rest move on to their next candidate, auction style. Points left
+    over re-query a tree over the slots still free, with k doubling up to
+    MAX_CANDIDATES, for at most max_rounds rounds; whatever is still
+    unassigned then is matched to the remaining slots by sort_assign.
+    Every round is O(n log n) and the round count is fixed, so the whole
+    assignment is too, even on clustered input. The n x k candidate tables
+    live on scratch memmaps; the slot tree, the directions and the per-point
+    index arrays are O(n) and stay in memory. Returns an index array such
+    that slots[result] lines up with coords.
+    """
+    n = len(coords)
+    if len(slots) != n:
+        raise ValueError(f"Need one slot per point, got {len(slots)} slots for {n} points")
+
+    directions = equalize_directions(unit_directions(coords))
+    slot_directions = np.asarray(unit_directions(slots), dtype=np.float64)
+
+    assignment = np.full(n, -1, dtype=np.int64)
+    slot_taken = np.zeros(n, dtype=bool)
+    pending = np.arange(n)
+
+    for _ in range(max_rounds):
+        if not pending.size:
+            break
+        free = np.flatnonzero(~slot_taken)
+        kk = min(k, free.size)
+        dist, cand = candidate_slots(slot_directions, free, directions[pending], kk)
+
+        pointer = np.zeros(len(pending), dtype=np.int64)
+        active = np.arange(len(pending))
+        while active.size:
+            proposal = cand[active, pointer[active]]
+            proposal_dist = dist[active, pointer[active]]
+
+            # Among proposals for free slots, the closest point per slot wins
+            open_mask = ~slot_taken[proposal]
+            bidders = active[open_mask]
+            order = np.lexsort((proposal_dist[open_mask], proposal[open_mask]))
+            bid_slots = proposal[open_mask][order]
+            first = np.ones(len(order), dtype=bool)
+            first[1:] = bid_slots[1:] != bid_slots[:-1]
+
+            winners = bidders[order[first]]
+            assignment[pending[winners]] = bid_slots[first]
+            slot_taken[bid_slots[first]] = True
+
+            won = np.zeros(len(pending), dtype=bool)
+            won[winners] = True
+            losers = active[~won[active]]
+            pointer[losers] += 1
+            active = losers[pointer[losers] < kk]
+
+        pending = pending[assignment[pending] < 0]
+        k = min(k * 2, MAX_CANDIDATES)
+
+    if pending.size:
+        free = np.flatnonzero(~slot_taken)
+        assignment[pending] = free[sort_assign(directions[pending], slot_directions[free])]
+
+    return assignment
+
+
+def spacing_stats(points, sample_pairs=DISTANCE_SAMPLE_PAIRS, seed=42):
+    """
+    Summarize point spacing in O(n log n) time and O(n) memory.
+
+    The minimum distance comes from a cKDTree nearest-neighbor query (k=2,
+    since each point's first hit is itself). The average pairwise distance
+    is estimated from randomly sampled pairs rather than all n²/2 of them;
+    for points spread over a sphere of radius R it should approach 4R/3.
+    """
+    points = np.asarray(points)
+    n = len(points)
+    if n < 2:
+        return {'min_distance': 0.0, 'mean_nn_distance': 0.0, 'avg_distance': 0.0}
+
+    tree = cKDTree(points)
+    nn_distances, _ = tree.query(points, k=2)
+    nn_distances = nn_distances[:, 1]
+
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, n, size=sample_pairs)
+    b = rng.integers(0, n - 1, size=sample_pairs)
+    b += b >= a  # skip self-pairs without rejection sampling
+    avg_distance = np.linalg.norm(points[a] - points[b], axis=1).mean()
+
+    return {
+        'min_distance': float(nn_distances.min()),
+        'mean_nn_distance': float(nn_distances.mean()),
+        'avg_distance': float(avg_distance),
+    }
@@ -0,0 +1,125 @@
+import time
+import pytest
+from coords_io import write_ndjson
+from indexer import PROFILES, index_dataset
+from local_search import LocalSearchIndex, saved_path_for
+from mock_meili import MockMeilisearch
+from uploader import IndexUploader, encode_document
+
+INDEX = 'test_index'
+
+
+def records(ids, suffix=''):
+    return [{'id': i, 'term': f'term {i}{suffix}', 'description': f'description of item {i}',
+             'x': float(i), 'y': -float(i)} for i in ids]
+
+
+def sync(server, prefix, **options):
+    return index_dataset(prefix, INDEX, PROFILES['2d'], url=server.url, fallback=False,
+                         test_searches=False, max_batch_bytes=2048, retries=0, **options)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # the sync manifest is written next to the process
+    with MockMeilisearch() as mock:
+        yield mock
+
+
+def test_sync_then_resync(server, tmp_path):
+    prefix = str(tmp_path / 'layout')
+    write_ndjson(prefix + '.ndjson', records(range(100)))
+
+    report = sync(server, prefix)
+    index = server.indexes[INDEX]
+    assert report['documents'] == 100
+    assert report['batches'] > 1
+    assert sorted(index['documents']) == sorted(str(i) for i in range(100))
+    assert index['settings'] == PROFILES['2d']['settings']
+    settings_tasks = sum(task['type'] == 'settingsUpdate' for task in server.tasks.values())
+    assert settings_tasks == 1
+
+    # Drop 0-9, relabel 10-19, add 100-104; 20-99 are unchanged
+    write_ndjson(prefix + '.ndjson', records(range(10, 20), ' (edited)') + records(range(20, 105)))
+    report = sync(server, prefix)
+    assert report['documents'] == 10 + 5 + 10
+    assert sorted(index['documents'], key=int) == [str(i) for i in range(10, 105)]
+    assert index['documents']['15']['term'] == 'term 15 (edited)'
+    assert sum(task['type'] == 'settingsUpdate' for task in server.tasks.values()) == settings_tasks
+    assert sum(task['type'] == 'documentDeletion' for task in server.tasks.values()) == 1
+
+    # Nothing changed: no uploads, no deletions
+    task_count = len(server.tasks)
+    report = sync(server, prefix)
+    assert report['documents'] == 0
+    assert len(server.tasks) == task_count
+    assert len(index['documents']) == 95
+
+
+def test_resync_after_index_lost(server, tmp_path):
+    prefix = str(tmp_path / 'layout')
+    write_ndjson(prefix + '.ndjson', records(range(50)))
+    sync(server, prefix)
+
+    server.indexes.clear()
+    report = sync(server, prefix)
+    assert report['documents'] == 50
+    assert len(server.indexes[INDEX]['documents']) == 50
+    assert server.indexes[INDEX]['settings'] == PROFILES['2d']['settings']
+
+
+def test_max_in_flight_must_be_positive():
+    with pytest.raises(ValueError):
+        IndexUploader('http://127.0.0.1:1', INDEX, max_in_flight=0)
+
+
+def test_upload_stops_at_first_failure():
+    consumed = []
+
+    def lines():
+        for doc in records(range(10000)):
+            consumed.append(doc['id'])
+            yield encode_document(doc)
+
+    # Nothing listens on port 1, so the first request fails
+    uploader = IndexUploader('http://127.0.0.1:1', INDEX, max_batch_bytes=1024, max_in_flight=2, retries=0)
+    with pytest.raises(Exception):
+        uploader.upload(lines())
+    assert len(consumed) < 1000
+
+
+class RejectingMeilisearch(MockMeilisearch):
+    """Mock server that refuses every document upload as too large"""
+
+    def handle(self, method, path, body):
+        if method == 'POST' and path.endswith('/documents'):
+            return 413, {'message': 'payload too large'}
+        return super().handle(method, path, body)
+
+
+def test_failed_upload_ends_the_run(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    prefix = str(tmp_path / 'layout')
+    write_ndjson(prefix + '.ndjson', records(range(100)))
+
+    with RejectingMeilisearch() as server:
+        assert sync(server, prefix) is None
+        assert not server.indexes[INDEX]['documents']
+    assert '✗ Indexing failed: 413' in capsys.readouterr().out
+    assert not (tmp_path / (INDEX + '.sync_manifest.json')).exists()
+
+
+def test_fallback_index_is_saved(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    prefix = str(tmp_path / 'layout')
+    write_ndjson(prefix + '.ndjson', records(range(30)))
+
+    start = time.perf_counter()
+    report = index_dataset(prefix, INDEX, PROFILES['2d'], url='http://127.0.0.1:1', test_searches=False)
+    assert time.perf_counter() - start < 5
+    assert report['documents'] == 30
+
+    index = LocalSearchIndex.load(saved_path_for(INDEX))
+    assert index.get_stats()['numberOfDocuments'] == 30
+    assert index.settings['displayedAttributes'] == PROFILES['2d']['settings']['displayedAttributes']
+    assert index.search('term 7')['hits'][0]['id'] == 7
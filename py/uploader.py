@@ -0,0 +1,166 @@
+import gzip
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Batches are cut by payload size, not document count, so a run of long
+# descriptions can't produce an oversized request (Meilisearch's default
+# payload limit is 100 MB) and tiny documents still travel in big batches.
+MAX_BATCH_BYTES = 8 * 1024 * 1024
+MAX_IN_FLIGHT = 4
+GZIP_LEVEL = 6
+REQUEST_TIMEOUT = 60
+HEALTH_TIMEOUT = 1.0     # the health probe is one try, so a dead server is noticed quickly
+
+# Transient failures (connection errors, 429 and 5xx) are retried with
+# exponential backoff. Every write the indexers make is idempotent (documents
+# are upserted by id), so POST and PATCH are safe to retry too.
+RETRIES = 5
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def encode_document(doc):
+    """Compact, key-sorted UTF-8 JSON for one document (one NDJSON line)"""
+    return json.dumps(doc, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class IndexUploader:
+    """
+    Client for one Meilisearch index over a pooled HTTP session.
+
+    Documents are streamed in as pre-encoded NDJSON lines, grouped into
+    batches of at most `max_batch_bytes`, gzip-compressed and posted with
+    at most `max_in_flight` requests outstanding; the producer blocks once
+    that many batches are queued, so memory stays bounded. Also exposes
+    get_task(), so it can be handed to meili_tasks.wait_for_tasks, and the
+    health/stats/search calls the indexer needs.
+    """
+
+    def __init__(self, url, index_uid, api_key=None, max_batch_bytes=MAX_BATCH_BYTES,
+                 max_in_flight=MAX_IN_FLIGHT, gzip_level=GZIP_LEVEL, primary_key='id', retries=RETRIES):
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight must be at least 1, got {max_in_flight}")
+        self.url = url.rstrip('/')
+        self.index_uid = index_uid
+        self.max_batch_bytes = max_batch_bytes
+        self.max_in_flight = max_in_flight
+        self.gzip_level = gzip_level
+        self.primary_key = primary_key
+
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=RETRY_BACKOFF, status_forcelist=RETRY_STATUSES,
+                      allowed_methods=None, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_in_flight, 1) + 1, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['Authorization'] = f'Bearer {api_key}'
+
+    def _request(self, method, path, **kwargs):
+        response = self.session.request(method, self.url + path, timeout=REQUEST_TIMEOUT, **kwargs)
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+    def health(self):
+        """Probe /health once, bypassing the session's retries"""
+        response = requests.get(self.url + '/health', headers=self.session.headers, timeout=HEALTH_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def search(self, query, options=None):
+        return self._request('POST', f'/indexes/{self.index_uid}/search', json=dict(options or {}, q=query))
+
+    def get_task(self, uid):
+        return self._request('GET', f'/tasks/{uid}')
+
+    def get_stats(self):
+        return self._request('GET', f'/indexes/{self.index_uid}/stats')
+
+    def update_settings(self, settings):
+        return self._request('PATCH', f'/indexes/{self.index_uid}/settings', json=settings)
+
+    def delete_documents(self, ids):
+        return self._request('POST', f'/indexes/{self.index_uid}/documents/delete-batch', json=list(ids))
+
+    def _post_batch(self, body):
+        headers = {'Content-Type': 'application/x-ndjson'}
+        if self.gzip_level:
+            body = gzip.compress(body, compresslevel=self.gzip_level)
+            headers['Content-Encoding'] = 'gzip'
+        start = time.perf_counter()
+        task = self._request('POST', f'/indexes/{self.index_uid}/documents',
+                             params={'primaryKey': self.primary_key}, data=body, headers=headers)
+        return task, len(body), time.perf_counter() - start
+
+    def iter_batches(self, lines):
+        """Group encoded lines into NDJSON bodies of at most max_batch_bytes"""
+        batch = []
+        size = 0
+        for line in lines:
+            if batch and size + len(line) + 1 > self.max_batch_bytes:
+                yield batch, b'\n'.join(batch)
+                batch, size = [], 0
+            batch.append(line)
+            size += len(line) + 1
+        if batch:
+            yield batch, b'\n'.join(batch)
+
+    def upload(self, lines, on_batch=None):
+        """
+        Upload encoded document lines; returns (tasks, stats).
+
+        `tasks` are the queued-task responses in submission order. `stats`
+        holds documents, raw and sent bytes, batch count, wall-clock
+        seconds and per-request upload latencies. The first failed request
+        stops the upload: no further batches are read or sent, batches not
+        yet started are dropped, and its exception is raised.
+        """
+        slots = threading.BoundedSemaphore(self.max_in_flight)
+        futures = []
+        errors = []
+        stats = {'documents': 0, 'raw_bytes': 0, 'sent_bytes': 0, 'batches': 0, 'upload_latencies': []}
+        start = time.perf_counter()
+
+        def post(body):
+            try:
+                if errors:
+                    return None
+                return self._post_batch(body)
+            except Exception as e:
+                errors.append(e)
+                raise
+            finally:
+                slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            for batch, body in self.iter_batches(lines):
+                slots.acquire()
+                if errors:
+                    slots.release()
+                    break
+                futures.append(pool.submit(post, body))
+                stats['documents'] += len(batch)
+                stats['raw_bytes'] += len(body)
+                stats['batches'] += 1
+
+            if errors:
+                for future in futures:
+                    future.cancel()
+                raise errors[0]
+
+            tasks = []
+            for future in futures:
+                task, sent_bytes, latency = future.result()
+                tasks.append(task)
+                stats['sent_bytes'] += sent_bytes
+                stats['upload_latencies'].append(latency)
+                if on_batch:
+                    on_batch(len(tasks), task)
+
+        stats['seconds'] = time.perf_counter() - start
+        return tasks, stats
@@ -0,0 +1,245 @@
+import argparse
+import heapq
+import os
+import time
+import numpy as np
+from chunked import iter_chunks
+
+# Graph-based approximate nearest-neighbor index over the full-dimensional
+# embeddings, in the spirit of HNSW's base layer: every vector keeps up to
+# max_degree neighbors and queries run a best-first beam search (width ef)
+# from a spread of entry points. The graph is bootstrapped from UMAP's kNN
+# graph (already computed and cached by reduce_pipeline), symmetrized so
+# clusters stay reachable from each other.
+#
+# Only the graph is persisted (embeddings.ann.npz next to the coordinate
+# files); the vectors stay in the embedding store and are read through its
+# memmap, so loading the index is cheap.
+ANN_PATH = 'embeddings.ann.npz'
+MAX_DEGREE = 32
+EF_SEARCH = 64
+ENTRY_POINTS = 256
+METRICS = ('cosine', 'euclidean')
+
+
+def symmetric_graph(knn_indices, knn_dists, max_degree=MAX_DEGREE):
+    """
+    Adjacency matrix (n, max_degree) from a directed kNN graph.
+
+    Reverse edges are added, duplicates dropped and each row keeps its
+    max_degree closest neighbors; unused slots are -1.
+    """
+    count, k = knn_indices.shape
+    src = np.repeat(np.arange(count, dtype=np.int32), k)
+    dst = knn_indices.astype(np.int32, copy=False).ravel()
+    dist = knn_dists.astype(np.float32, copy=False).ravel()
+    keep = (dst >= 0) & (dst != src)
+    src, dst, dist = src[keep], dst[keep], dist[keep]
+
+    src, dst = np.concatenate([src, dst]), np.concatenate([dst, src])
+    dist = np.concatenate([dist, dist])
+
+    order = np.lexsort((dst, src))
+    src, dst, dist = src[order], dst[order], dist[order]
+    unique = np.ones(len(src), dtype=bool)
+    unique[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    src, dst, dist = src[unique], dst[unique], dist[unique]
+
+    order = np.lexsort((dist, src))
+    src, dst = src[order], dst[order]
+    rank = np.arange(len(src)) - np.searchsorted(src, src)
+    keep = rank < max_degree
+
+    graph = np.full((count, max_degree), -1, dtype=np.int32)
+    graph[src[keep], rank[keep]] = dst[keep]
+    return graph
+
+
+class VectorIndex:
+    """Approximate top-k search over `vectors` (any (n, dim) array or memmap)"""
+
+    def __init__(self, vectors, graph, entry_points, metric='cosine', ids=None, ef=EF_SEARCH):
+        if metric not in METRICS:
+            raise ValueError(f"Unsupported metric {metric!r}, expected one of {METRICS}")
+        self.vectors = vectors
+        self.graph = graph
+        self.entry_points = entry_points
+        self.metric = metric
+        self.ef = ef
+        self.ids = list(ids) if ids is not None else None
+        self.rows = {str(item_id): row for row, item_id in enumerate(self.ids)} if ids is not None else None
+        self.norms = self._row_norms(vectors)
+
+    @staticmethod
+    def _row_norms(vectors):
+        norms = np.empty(len(vectors), dtype=np.float32)
+        for start, stop in iter_chunks(len(vectors)):
+            norms[start:stop] = np.linalg.norm(np.asarray(vectors[start:stop], dtype=np.float32), axis=1)
+        return norms
+
+    @classmethod
+    def from_knn(cls, vectors, knn_indices, knn_dists, metric='cosine', ids=None,
+                 max_degree=MAX_DEGREE, entry_points=ENTRY_POINTS, seed=42):
+        """Build from a precomputed kNN graph, e.g. UMAP's (knn_indices, knn_dists, ...)"""
+        graph = symmetric_graph(np.asarray(knn_indices), np.asarray(knn_dists), max_degree)
+        rng = np.random.default_rng(seed)
+        entries = np.sort(rng.choice(len(vectors), size=min(entry_points, len(vectors)), replace=False))
+        return cls(vectors, graph, entries.astype(np.int32), metric=metric, ids=ids)
+
+    def save(self, path=ANN_PATH, digest=''):
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, graph=self.graph, entry_points=self.entry_points,
+                 metric=np.array(self.metric), digest=np.array(digest))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, vectors, ids=None, ef=EF_SEARCH):
+        with np.load(path) as saved:
+            graph = saved['graph']
+            if len(graph) != len(vectors):
+                raise ValueError(f"{path} was built for {len(graph)} vectors, store has {len(vectors)}")
+            return cls(vectors, graph, saved['entry_points'], metric=str(saved['metric']), ids=ids, ef=ef)
+
+    @staticmethod
+    def saved_digest(path):
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as saved:
+            return str(saved['digest'])
+
+    def _distances(self, query, query_norm, rows):
+        block = np.asarray(self.vectors[rows], dtype=np.float32)
+        dots = block @ query
+        if self.metric == 'cosine':
+            return 1.0 - dots / np.maximum(self.norms[rows] * query_norm, 1e-12)
+        return np.sqrt(np.maximum(self.norms[rows] ** 2 + query_norm ** 2 - 2 * dots, 0))
+
+    def search(self, query, k=10, ef=None, exclude=()):
+        """Return [(row, distance)] for the k nearest vectors to `query`, closest first"""
+        exclude = set(exclude)
+        ef = max(ef or self.ef, k + len(exclude))
+        query = np.asarray(query, dtype=np.float32).ravel()
+        query_norm = float(np.linalg.norm(query))
+
+        visited = set(self.entry_points.tolist())
+        distances = self._distances(query, query_norm, self.entry_points)
+        seeds = sorted(zip(distances.tolist(), self.entry_points.tolist()))[:ef]
+        candidates = list(seeds)
+        heapq.heapify(candidates)
+        results = [(-d, row) for d, row in seeds]  # max-heap of the best ef so far
+        heapq.heapify(results)
+
+        while candidates:
+            dist, row = heapq.heappop(candidates)
+            if len(results) >= ef and dist > -results[0][0]:
+                break
+            neighbors = [n for n in self.graph[row].tolist() if n >= 0 and n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+            for n, d in zip(neighbors, self._distances(query, query_norm, neighbors).tolist()):
+                if len(results) < ef or d < -results[0][0]:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(results, (-d, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        found = sorted((-d, row) for d, row in results if row not in exclude)
+        return [(row, d) for d, row in found[:k]]
+
+    def search_id(self, item_id, k=10, ef=None):
+        """Nearest neighbors of a stored item, excluding the item itself"""
+        row = self.rows[str(item_id)]
+        return self.search(self.vectors[row], k=k, ef=ef, exclude=(row,))
+
+    def exact_search(self, query, k=10, exclude=()):
+        """Brute-force top-k in row chunks, for recall checks"""
+        query = np.asarray(query, dtype=np.float32).ravel()
+        query_norm = float(np.linalg.norm(query))
+        best_rows = np.empty(0, dtype=np.int64)
+        best_dists = np.empty(0, dtype=np.float32)
+        for start, stop in iter_chunks(len(self.vectors)):
+            rows = np.arange(start, stop)
+            dists = self._distances(query, query_norm, slice(start, stop))
+            best_rows = np.concatenate([best_rows, rows])
+            best_dists = np.concatenate([best_dists, dists])
+            top = np.argsort(best_dists)[:k + len(exclude)]
+            best_rows, best_dists = best_rows[top], best_dists[top]
+        return [(int(r), float(d)) for r, d in zip(best_rows, best_dists) if r not in exclude][:k]
+
+
+def measure(index, samples=100, k=10, ef=None, seed=0):
+    """Mean recall@k against brute force and query latency percentiles (ms)"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(index.vectors), size=min(samples, len(index.vectors)), replace=False)
+    latencies, recalls = [], []
+    for row in rows.tolist():
+        start = time.perf_counter()
+        approx = index.search(index.vectors[row], k=k, ef=ef, exclude=(row,))
+        latencies.append((time.perf_counter() - start) * 1000)
+        exact = index.exact_search(index.vectors[row], k=k, exclude=(row,))
+        recalls.append(len({r for r, _ in approx} & {r for r, _ in exact}) / max(len(exact), 1))
+    latencies.sort()
+    return {
+        'recall': float(np.mean(recalls)),
+        'p50_ms': latencies[len(latencies) // 2],
+        'p95_ms': latencies[int(len(latencies) * 0.95)],
+    }
+
+
+def build_index(config, data, vectors, knn, path=ANN_PATH, digest=''):
+    """Build from the pipeline's kNN graph and save next to the coordinate files"""
+    start = time.perf_counter()
+    index = VectorIndex.from_knn(vectors, knn[0], knn[1], metric=config['knn']['metric'],
+                                 ids=[item['id'] for item in data])
+    index.save(path, digest)
+    print(f"✓ Vector index ({index.graph.shape[1]} max neighbors) built in {time.perf_counter() - start:.1f}s → {path}")
+    return index
+
+
+def main():
+    from embedding_store import load_embeddings
+    from reduce_pipeline import CONFIG_PATH, load_config, shared_knn, vectors_digest
+
+    parser = argparse.ArgumentParser(description="Approximate nearest-neighbor search over the raw embeddings")
+    parser.add_argument('--config', default=CONFIG_PATH, help="Pipeline config (default: %(default)s)")
+    parser.add_argument('--index', help=f"Index file (default: the config's ann.path, {ANN_PATH})")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild even if the index matches the vectors")
+    parser.add_argument('--id', action='append', help="Find items related to this id; repeatable")
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--ef', type=int, default=EF_SEARCH, help="Search beam width (default: %(default)s)")
+    parser.add_argument('--measure', type=int, metavar='N', help="Check recall and latency on N sampled queries")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    path = args.index or config['ann']['path']
+    data, vectors = load_embeddings(config['input'])
+    ids = [item['id'] for item in data]
+
+    digest = vectors_digest(vectors)
+    if args.rebuild or VectorIndex.saved_digest(path) != digest:
+        knn = shared_knn(vectors, config['knn'], config['random_state'])
+        index = build_index(config, data, vectors, knn, path, digest)
+        index.ef = args.ef
+    else:
+        index = VectorIndex.load(path, vectors, ids=ids, ef=args.ef)
+        print(f"✓ Loaded vector index for {len(ids)} items from {path}")
+
+    for item_id in args.id or []:
+        if str(item_id) not in index.rows:
+            print(f"✗ Unknown id {item_id}")
+            continue
+        start = time.perf_counter()
+        neighbors = index.search_id(item_id, k=args.k)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\nRelated to '{data[index.rows[str(item_id)]]['term']}' ({elapsed:.1f} ms):")
+        for row, distance in neighbors:
+            print(f"  • {data[row]['term']} (distance {distance:.3f})")
+
+    if args.measure:
+        stats = measure(index, samples=args.measure, k=args.k, ef=args.ef)
+        print(f"\nRecall@{args.k}: {stats['recall']:.1%}  p50 {stats['p50_ms']:.2f} ms  p95 {stats['p95_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
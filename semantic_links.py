@@ -0,0 +1,158 @@
+# semantic_links.py - Embed vault notes and suggest related but unlinked notes
+
+import hashlib
+import os
+import pickle
+import re
+import threading
+import zlib
+from collections import namedtuple
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+# Notes are embedded with a local sentence-transformers model when one is
+# installed and already downloaded (never fetched at runtime); otherwise
+# with TF-IDF over hashed terms. Vectors are cached by content hash, so a
+# rerun only embeds notes whose text changed. For TF-IDF the cache holds
+# each note's hashed term counts and IDF is reapplied over the whole vault,
+# which is cheap and keeps weights correct as the vault grows.
+SENTENCE_MODEL = "all-MiniLM-L6-v2"
+HASH_DIM = 2048
+RELATED_LIMIT = 5
+RELATED_MIN_SCORE = 0.15
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9_'-]+")
+STOP_WORDS = frozenset("""
+a an and are as at be but by can do for from has have how if in into is it its
+not of on or so that the their then there these this to was we were what when
+which who will with you your created
+""".split())
+
+SemanticStats = namedtuple("SemanticStats", ["notes", "embedded", "backend"])
+
+def content_hash(content):
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+def hashed_term_counts(content):
+    """Sparse (buckets, counts) term frequencies with terms hashed into HASH_DIM buckets"""
+    tokens = [t for t in TOKEN_PATTERN.findall(content.lower()) if t not in STOP_WORDS]
+    buckets = np.fromiter((zlib.crc32(t.encode("utf-8")) % HASH_DIM for t in tokens), dtype=np.int32, count=len(tokens))
+    buckets, counts = np.unique(buckets, return_counts=True)
+    return buckets.astype(np.int32), counts.astype(np.float32)
+
+def load_encoder():
+    """(backend name, model or None); the model is only used if available offline"""
+    if SentenceTransformer is not None:
+        try:
+            return f"sentence:{SENTENCE_MODEL}", SentenceTransformer(SENTENCE_MODEL, local_files_only=True)
+        except Exception:
+            pass
+    return f"tfidf:{HASH_DIM}", None
+
+class SemanticIndex:
+    """
+    Note vectors for a vault, cached on disk per content hash, with an
+    exact cosine top-k over the whole vault (vaults are small enough that
+    one matrix-vector product per query takes well under a millisecond).
+    Safe to share between sessions: updates and queries take a lock.
+    """
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.backend, self.model = load_encoder()
+        self.cache = self._load_cache()
+        self.hashes = {}
+        self.paths = []
+        self.rows = {}
+        self.matrix = None
+        self.lock = threading.Lock()
+
+    def _load_cache(self):
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, "rb") as f:
+                    saved = pickle.load(f)
+                if saved.get("backend") == self.backend:
+                    return saved["vectors"]
+            except (OSError, pickle.UnpicklingError, EOFError, KeyError):
+                pass
+        return {}
+
+    def _save_cache(self):
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"backend": self.backend, "vectors": self.cache}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_path)
+
+    def _embed(self, contents):
+        if self.model is not None:
+            return list(self.model.encode(contents, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32))
+        return [hashed_term_counts(content) for content in contents]
+
+    def _build_matrix(self, hashes):
+        if self.model is not None:
+            return np.stack([self.cache[h] for h in hashes]) if hashes else np.zeros((0, 1), np.float32)
+
+        matrix = np.zeros((len(hashes), HASH_DIM), dtype=np.float32)
+        for row, h in enumerate(hashes):
+            buckets, counts = self.cache[h]
+            matrix[row, buckets] = 1.0 + np.log(counts)
+        df = np.count_nonzero(matrix, axis=0)
+        matrix *= np.log((1.0 + len(hashes)) / (1.0 + df)) + 1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def update(self, contents):
+        """
+        Sync with {path: content}, embedding only notes whose content hash
+        is not cached yet. Returns SemanticStats.
+        """
+        with self.lock:
+            return self._update(contents)
+
+    def _update(self, contents):
+        hashes = {path: content_hash(content) for path, content in contents.items()}
+        missing = {}
+        for path, h in hashes.items():
+            if h not in self.cache and h not in missing:
+                missing[h] = contents[path]
+
+        if missing:
+            for h, vector in zip(missing, self._embed(list(missing.values()))):
+                self.cache[h] = vector
+
+        if missing or hashes != self.hashes:
+            self.hashes = hashes
+            self.paths = list(hashes)
+            self.rows = {path: row for row, path in enumerate(self.paths)}
+            self.matrix = self._build_matrix([hashes[path] for path in self.paths])
+
+            live = set(hashes.values())
+            stale = [h for h in self.cache if h not in live]
+            for h in stale:
+                del self.cache[h]
+            if missing or stale:
+                self._save_cache()
+
+        return SemanticStats(len(hashes), len(missing), self.backend)
+
+    def related(self, path, exclude=(), k=RELATED_LIMIT, min_score=RELATED_MIN_SCORE):
+        """[(path, score)] most similar to `path`, skipping it and any path in `exclude`"""
+        with self.lock:
+            row = self.rows.get(path)
+            if row is None or self.matrix is None:
+                return []
+            scores = self.matrix @ self.matrix[row]
+            paths = self.paths
+        exclude = set(exclude)
+        results = []
+        for other in np.argsort(-scores).tolist():
+            if scores[other] < min_score or len(results) >= k:
+                break
+            if other != row and paths[other] not in exclude:
+                results.append((paths[other], float(scores[other])))
+        return results
@@ -1,103 +1,356 @@
+import argparse
+import fnmatch
 import json
-import hashlib
 import binascii
 import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from chunk_store import encode_chunks, open_store, split_chunks, split_stream
+from compression import available_codecs
+from sequence_log import CHUNK, LOG_FILE
 
 # --- Configuration ---
-MAP_FILE = "sequence_dna_map.json"
+MAP_FILE = "sequence_dna_map.json"      # legacy whole-file map, imported once
+MANIFEST_FILE = "sequence_manifest.json"
+BATCH_PATTERN = "*.md"
+POOL_MIN_FILES = 64        # below this, starting worker processes costs more than it saves
+# Pool workers send a file's compressed chunks back in one result, so only
+# files up to LARGE_FILE go to the pool, and at most PENDING_PER_WORKER
+# results per worker are in flight. Larger files and stdin are encoded in
+# this process, each chunk appended to the log as soon as it's compressed.
+LARGE_FILE = 8 * 1024 * 1024
+PENDING_PER_WORKER = 4
+PROGRESS_EVERY = 500
 
-def load_map():
-    if os.path.exists(MAP_FILE):
-        try:
-            with open(MAP_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-def save_map(data_map):
-    with open(MAP_FILE, 'w') as f:
-        json.dump(data_map, f, indent=4)
-
-def text_to_hex_layers(text):
+def migrate_legacy_map(store):
     """
-    Layer 1: Convert raw text to Hex strings (Color Code style).
-    Example: 'A' -> '41'
+    Import a sequence_dna_map.json written by earlier versions into the
+    log store, then rename it so it's only imported once.
     """
-    # Convert string to bytes, then to hex
-    hex_data = binascii.hexlify(text.encode('utf-8')).decode('utf-8')
-    return hex_data
+    if not os.path.exists(MAP_FILE):
+        return 0
+    with open(MAP_FILE, 'r') as f:
+        dna_map = json.load(f)
+    
+    for sequence_id, entry in dna_map.items():
+        data = binascii.unhexlify(entry)
+        # Stored under the full SHA-256 of the bytes. Map ids hashed the hex
+        # layer (sha256(hex)[:10]), so they are not prefixes of that key and
+        # each one gets an alias to keep resolving
+        key = store.resolve(store.put_document(data)[0])
+        if not key.startswith(sequence_id):
+            store.add_alias(sequence_id, key)
+    
+    os.replace(MAP_FILE, MAP_FILE + ".migrated")
+    print(f"[+] Imported {len(dna_map)} sequences from {MAP_FILE} into {LOG_FILE}")
+    return len(dna_map)
 
-def hex_to_text_layers(hex_data):
-    """
-    Reverse Layer 1
-    """
-    try:
-        bytes_data = binascii.unhexlify(hex_data)
-        return bytes_data.decode('utf-8')
-    except:
-        return "[Error: Invalid Hex Sequence]"
+def load_store():
+    store = open_store()
+    migrate_legacy_map(store)
+    return store
 
-def recursive_compress(content):
+def recursive_compress(content, store=None):
     """
     Logic:
-    1. Analyze the content (5000 chars).
-    2. Create a unique 'fingerprint' (Hash) of this content.
-    3. Store the actual content in our 'Sequence Map' (DNA file).
-    4. Return the first 10 chars of the fingerprint as the 'Compressed Key'.
+    1. Split the content into content-defined chunks (rolling hash boundaries).
+    2. Append each new chunk, compressed, to the sequence log under its SHA-256.
+    3. Append a record mapping the full SHA-256 'fingerprint' to the chunk list.
+    4. Return the shortest unique prefix of the fingerprint (10+ chars) as the 'Compressed Key'.
     
-    This effectively reduces the user-facing string to 10 chars by 
-    offloading the entropy to the local map file.
+    Documents that share text share the chunks holding it, and a new
+    document costs one append no matter how big the store already is.
+
+    The fingerprint is the SHA-256 of the UTF-8 text itself. The original
+    map-file version hashed the hex layer instead (sha256(hex)[:10]), so
+    the same text now gets a different ID; IDs from that version resolve
+    through the store's alias records.
     """
+    start = time.perf_counter()
+    store = store or load_store()
+    data = content.encode('utf-8')
+    config, dictionary = store.encoder_settings()
+    digest, size, encoded = encode_chunks(split_chunks(data), config, dictionary, store.log.keys(CHUNK))
     
-    # Layer 1: Hex Conversion (As requested)
-    hex_layer = text_to_hex_layers(content)
+    # Check if this exact sequence already exists to save space; put_encoded
+    # compares its chunks so a hash collision can't alias another document
+    if store.has_document(digest):
+        sequence_id = store.put_encoded(digest, size, encoded)[0]
+        print(f"\n[+] Sequence recognized in existing map (content verified).")
+        return sequence_id
     
-    # Layer 2: Generate Unique Sequence ID (The "10 Char" Key)
-    # We use SHA256 to generate a unique signature, then take the first 10 chars.
-    sequence_id = hashlib.sha256(hex_layer.encode()).hexdigest()[:10]
+    sequence_id, chunks, new_chunks, new_bytes = store.put_encoded(digest, size, encoded)
     
-    # Layer 3: Map the ID to the Content (The "Sequence that can occur")
-    # We are mapping the "Color/Hex Code" to a stored sequence.
-    dna_map = load_map()
-    
-    # Check if this exact sequence already exists to save space
-    if sequence_id not in dna_map:
-        dna_map[sequence_id] = hex_layer
-        save_map(dna_map)
-        print(f"\n[+] New sequence learned and mapped to ID: {sequence_id}")
-    else:
-        print(f"\n[+] Sequence recognized in existing map.")
-
+    elapsed = time.perf_counter() - start
+    print(f"\n[+] New sequence learned and mapped to ID: {sequence_id}")
+    print(f"    {chunks} chunks, {new_chunks} new ({chunks - new_chunks} deduplicated), "
+          f"{new_bytes} bytes stored for {len(data)} bytes of text")
+    print(f"    {len(data) / 1e6 / max(elapsed, 1e-9):.1f} MB/s")
     return sequence_id
 
-def recursive_decompress(short_id):
+def recursive_decompress(short_id, store=None):
     """
     Logic:
-    1. Take the 10-char ID.
-    2. Look up the Hex Sequence in the 'DNA Map'.
-    3. Reverse the Hex Layer to get original text.
+    1. Take the ID (or any unique prefix of the fingerprint).
+    2. Seek to its record through the offset index.
+    3. Join the decompressed chunks to get the original text.
     """
-    dna_map = load_map()
-    
-    if short_id not in dna_map:
-        return None
-    
-    # Retrieve the Hex Layer
-    hex_layer = dna_map[short_id]
-    
-    # Reverse to Text
-    original_text = hex_to_text_layers(hex_layer)
-    return original_text
+    store = store or load_store()
+    data = store.get_document(short_id)
+    return data.decode('utf-8') if data is not None else None
+
+def store_stats(store=None):
+    """Logical vs stored size across the whole store"""
+    return (store or load_store()).stats()
+
+def compact_store(store=None):
+    """Rewrite the log without deleted documents and unreferenced chunks"""
+    return (store or load_store()).compact()
+
+# --- Batch mode ---
+
+_worker_settings = None
+
+def _init_worker(config, dictionary, known):
+    global _worker_settings
+    _worker_settings = (config, dictionary, known)
+
+def encode_file(path):
+    """
+    Chunk, hash and compress one file, reading it STREAM_BLOCK bytes at a
+    time. Runs in pool workers for files up to LARGE_FILE; the parent is
+    the only one writing the log.
+    """
+    config, dictionary, known = _worker_settings
+    try:
+        with open(path, 'rb') as f:
+            digest, size, encoded = encode_chunks(split_stream(f), config, dictionary, known)
+    except OSError as e:
+        return path, None, str(e), None
+    return path, digest, size, encoded
+
+def collect_files(paths, pattern=BATCH_PATTERN):
+    """
+    (path, manifest name) for every file to compress. Directories are
+    walked for files matching `pattern` and named relative to the
+    directory's parent, so restoring recreates the directory itself.
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append((path, os.path.basename(path)))
+            continue
+        base = os.path.dirname(os.path.abspath(path))
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(names):
+                if fnmatch.fnmatch(name, pattern):
+                    full = os.path.join(root, name)
+                    files.append((full, os.path.relpath(os.path.abspath(full), base)))
+    return files
+
+def write_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+def batch_compress(paths, manifest_path=MANIFEST_FILE, workers=None, pattern=BATCH_PATTERN):
+    """
+    Compress files, directories and/or stdin ('-') in one run and write a
+    manifest mapping each input to its ID. Files are encoded in a process
+    pool and appended to the store by this process in input order.
+    """
+    start = time.perf_counter()
+    store = load_store()
+    config, dictionary = store.encoder_settings()
+    known = frozenset(store.log.keys(CHUNK))
+
+    documents = []
+    errors = []
+    totals = {"files": 0, "bytes_in": 0, "chunks": 0, "new_chunks": 0, "new_bytes": 0}
+
+    appended = [0, 0]   # chunks and bytes written by append_chunk since the last record
+
+    def append_chunk(digest, flags, payload):
+        new_bytes = store.put_chunk(digest, flags, payload)
+        if new_bytes:
+            appended[0] += 1
+            appended[1] += new_bytes
+
+    def record(name, digest, size, encoded):
+        streamed_chunks, streamed_bytes = appended
+        appended[:] = [0, 0]
+        try:
+            sequence_id, chunks, new_chunks, new_bytes = store.put_encoded(digest, size, encoded)
+        except ValueError as e:
+            errors.append({"path": name, "error": str(e)})
+            return
+        new_chunks += streamed_chunks
+        new_bytes += streamed_bytes
+        documents.append({"path": name, "id": sequence_id, "sha256": digest, "size": size,
+                          "chunks": chunks, "new_chunks": new_chunks})
+        totals["files"] += 1
+        totals["bytes_in"] += size
+        totals["chunks"] += chunks
+        totals["new_chunks"] += new_chunks
+        totals["new_bytes"] += new_bytes
+        if totals["files"] % PROGRESS_EVERY == 0:
+            print(f"    {totals['files']} files, {totals['bytes_in'] / 1e6:.1f} MB", file=sys.stderr)
+
+    def encode_here(stream):
+        return encode_chunks(split_stream(stream), config, dictionary, known, sink=append_chunk)
+
+    if '-' in paths:
+        record('-', *encode_here(sys.stdin.buffer))
+
+    files = collect_files([path for path in paths if path != '-'], pattern)
+    names = dict(files)
+
+    def handle(result):
+        path, digest, size, encoded = result
+        if digest is None:
+            errors.append({"path": names[path], "error": size})
+        else:
+            record(names[path], digest, size, encoded)
+
+    def handle_here(path):
+        try:
+            with open(path, 'rb') as f:
+                result = encode_here(f)
+        except OSError as e:
+            errors.append({"path": names[path], "error": str(e)})
+            return
+        record(names[path], *result)
+
+    def is_large(path):
+        try:
+            return os.path.getsize(path) > LARGE_FILE
+        except OSError:
+            return False   # the worker reports it
+
+    if len(files) >= POOL_MIN_FILES and workers != 1:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(config, dictionary, known)) as pool:
+            # Results are taken in input order, so a slow file holds back at
+            # most a window of finished ones
+            pending = deque()
+            for path in names:
+                if is_large(path):
+                    while pending:
+                        handle(pending.popleft().result())
+                    handle_here(path)
+                    continue
+                pending.append(pool.submit(encode_file, path))
+                if len(pending) >= workers * PENDING_PER_WORKER:
+                    handle(pending.popleft().result())
+            while pending:
+                handle(pending.popleft().result())
+    else:
+        for path in names:
+            handle_here(path)
+
+    elapsed = time.perf_counter() - start
+    totals["seconds"] = round(elapsed, 3)
+    write_manifest(manifest_path, {"store": LOG_FILE, "codec": config["codec"],
+                                   "documents": documents, "errors": errors, "totals": totals})
+
+    print(f"[+] {totals['files']} files, {totals['bytes_in']} bytes -> "
+          f"{totals['new_chunks']} new chunks, {totals['new_bytes']} bytes appended to {LOG_FILE}")
+    if totals["new_bytes"]:
+        print(f"    {totals['bytes_in'] / totals['new_bytes']:.2f}x for this run "
+              f"({totals['chunks'] - totals['new_chunks']} chunks deduplicated)")
+    print(f"    {totals['bytes_in'] / 1e6 / max(elapsed, 1e-9):.1f} MB/s, manifest written to {manifest_path}")
+    for error in errors:
+        print(f"[!] Skipped {error['path']}: {error['error']}", file=sys.stderr)
+    return documents
+
+def batch_decompress(ids=(), manifest_path=None, out_dir='.'):
+    """
+    Write the given IDs to stdout, or restore every document listed in a
+    manifest under out_dir; returns the number of documents written.
+    """
+    store = load_store()
+    if manifest_path is None:
+        for sequence_id in ids:
+            try:
+                data = store.get_document(sequence_id)
+            except ValueError as e:
+                print(f"[!] Error: {e}", file=sys.stderr)
+                return 0
+            if data is None:
+                print(f"[!] Error: Unknown ID {sequence_id}", file=sys.stderr)
+                return 0
+            sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+        return len(ids)
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    written = 0
+    for entry in manifest["documents"]:
+        try:
+            data = store.get_document(entry.get("sha256", entry["id"]))
+        except ValueError as e:
+            print(f"[!] {entry['path']}: {e}", file=sys.stderr)
+            continue
+        if data is None:
+            print(f"[!] Missing {entry['id']} ({entry['path']})", file=sys.stderr)
+            continue
+        if entry["path"] == '-':
+            sys.stdout.buffer.write(data)
+            continue
+        target = os.path.join(out_dir, entry["path"])
+        os.makedirs(os.path.dirname(target) or '.', exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        written += 1
+    print(f"[+] Restored {written} files into {out_dir}")
+    return written
+
+def run_cli(argv):
+    parser = argparse.ArgumentParser(description="Batch mode for the sequence compressor (no arguments: interactive menu)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compress = commands.add_parser("compress", help="Compress files, directories or stdin ('-')")
+    compress.add_argument("paths", nargs="+", help="Files, directories (walked recursively) or '-' for stdin")
+    compress.add_argument("--manifest", default=MANIFEST_FILE, help=f"Manifest to write (default: {MANIFEST_FILE})")
+    compress.add_argument("--pattern", default=BATCH_PATTERN, help=f"File pattern inside directories (default: {BATCH_PATTERN})")
+    compress.add_argument("--workers", type=int, default=None, help=f"Worker processes (default: CPU count, 1 disables the pool); "
+                          f"files over {LARGE_FILE // (1024 * 1024)} MB are encoded in the main process")
+
+    decompress = commands.add_parser("decompress", help="Write IDs to stdout, or restore a manifest into a directory")
+    decompress.add_argument("ids", nargs="*", help="IDs to write to stdout")
+    decompress.add_argument("--manifest", default=None, help="Restore every document in this manifest")
+    decompress.add_argument("--out", default=".", help="Directory to restore into (default: current directory)")
+
+    args = parser.parse_args(argv)
+    if args.command == "compress":
+        batch_compress(args.paths, args.manifest, args.workers, args.pattern)
+    elif args.ids or args.manifest:
+        batch_decompress(args.ids, args.manifest, args.out)
+    else:
+        parser.error("decompress needs IDs or --manifest")
 
 def main():
-    print("--- Recursive Hex-Layer Compressor ---")
-    print("Logic: Text -> Hex -> Sequence Map -> 10-Char ID")
+    if len(sys.argv) > 1:
+        run_cli(sys.argv[1:])
+        return
+
+    print("--- Sequence Compressor ---")
+    print("Logic: Text -> Chunks -> Sequence Log -> Short ID")
     print("------------------------------------------")
     print("1. Compress (Input Text File)")
-    print("2. Decompress (Input 10-char Code)")
+    print("2. Decompress (Input ID)")
+    print("3. Store Statistics")
+    print("4. Delete (Input ID)")
+    print("5. Compact Store")
+    print("6. Set Compression Codec")
     
-    choice = input("\nSelect Option (1/2): ").strip()
+    choice = input("\nSelect Option (1-6): ").strip()
     
     if choice == '1':
         path = input("Enter input text file path: ").strip()
@@ -118,12 +371,16 @@ def main():
         print(f"Compressed ID: {short_code}")
         print(f"Size:          {len(short_code)} chars")
         print(f"--------------------------------")
-        print(f"(Note: The mapping data is stored in '{MAP_FILE}')")
+        print(f"(Note: The sequence data is stored in '{LOG_FILE}')")
 
     elif choice == '2':
-        short_id = input("Enter the 10-char ID: ").strip()
+        short_id = input("Enter the ID: ").strip()
         
-        result = recursive_decompress(short_id)
+        try:
+            result = recursive_decompress(short_id)
+        except ValueError as e:
+            print(f"\n[!] Error: {e}")
+            return
         
         if result:
             print(f"\nSUCCESS! Recovered Content:")
@@ -137,7 +394,46 @@ def main():
                     f.write(result)
                     print("Saved.")
         else:
-            print("\n[!] Error: Unknown ID. This sequence is not in your local map file.")
+            print("\n[!] Error: Unknown ID. This sequence is not in your local store.")
+
+    elif choice == '3':
+        stats = store_stats()
+        print(f"\nCodec:         {stats['codec']}")
+        print(f"Documents:     {stats['documents']}")
+        print(f"Original size: {stats['logical_bytes']} bytes")
+        print(f"Stored size:   {stats['stored_bytes']} bytes")
+        print(f"Ratio:         {stats['dedup_ratio']:.2f}x (deduplication + compression)")
+
+    elif choice == '4':
+        short_id = input("Enter the ID: ").strip()
+        store = load_store()
+        try:
+            found = store.has_document(short_id)
+        except ValueError as e:
+            print(f"\n[!] Error: {e}")
+            return
+        if found:
+            store.delete_document(short_id)
+            print(f"\n[+] Deleted {short_id}. Run 'Compact Store' to reclaim its space.")
+        else:
+            print("\n[!] Error: Unknown ID. This sequence is not in your local store.")
+
+    elif choice == '5':
+        before, after = compact_store()
+        print(f"\nCompacted {LOG_FILE}: {before} -> {after} bytes")
+
+    elif choice == '6':
+        store = load_store()
+        print(f"\nCurrent codec: {store.config['codec']} (level {store.config['level']})")
+        codec = input(f"Codec for new chunks ({'/'.join(available_codecs())}): ").strip()
+        level = input("Level (blank for default): ").strip()
+        try:
+            store.configure(codec, int(level) if level else None)
+            if codec in ('zlib', 'zstd') and input("Train a shared dictionary from stored chunks? (y/n): ").lower() == 'y':
+                print(f"[+] Trained a {store.train()} byte dictionary")
+            print(f"[+] New chunks will use {codec}")
+        except ValueError as e:
+            print(f"\n[!] Error: {e}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,87 @@
+import argparse
+import binascii
+import glob
+import os
+import time
+from chunk_store import split_chunks
+from compression import DICTIONARY_CODECS, available_codecs, compress, decompress, train_dictionary
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_documents(root):
+    documents = []
+    for path in sorted(glob.glob(os.path.join(root, '**', '*.md'), recursive=True)):
+        with open(path, 'rb') as f:
+            documents.append(f.read())
+    return documents
+
+
+def split_pieces(documents, whole):
+    return documents if whole else [bytes(chunk) for doc in documents for chunk in split_chunks(doc)]
+
+
+def run_case(label, pieces, encode, decode):
+    """Encode and decode every piece; prints ratio and MB/s both ways, returns the ratio"""
+    original = sum(len(piece) for piece in pieces)
+    start = time.perf_counter()
+    encoded = [encode(piece) for piece in pieces]
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded = [decode(payload) for payload in encoded]
+    decode_seconds = time.perf_counter() - start
+    assert decoded == [bytes(piece) for piece in pieces], f"{label} did not round-trip"
+
+    stored = sum(len(payload) for payload in encoded)
+    print(f"  {label:<22} {original / stored:>6.2f}x  {stored:>9,} bytes  "
+          f"{original / 1e6 / max(encode_seconds, 1e-9):>8.1f} MB/s in  "
+          f"{original / 1e6 / max(decode_seconds, 1e-9):>8.1f} MB/s out")
+    return original / stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare stored-chunk codecs against the hex layer on markdown files")
+    parser.add_argument('root', nargs='?', default=REPO_ROOT, help="Directory to scan for .md files (default: the repository)")
+    parser.add_argument('--whole', action='store_true', help="Compress whole files instead of store-sized chunks")
+    args = parser.parse_args()
+
+    documents = load_documents(args.root)
+    if not documents:
+        print(f"No .md files under {args.root}")
+        return
+    pieces = split_pieces(documents, args.whole)
+    total = sum(len(doc) for doc in documents)
+    print(f"{len(documents)} files, {total:,} bytes, {len(pieces)} {'files' if args.whole else 'chunks'}\n")
+
+    run_case("hex layer", pieces, binascii.hexlify, binascii.unhexlify)
+    for codec in available_codecs():
+        run_case(codec, pieces, lambda piece, c=codec: compress(piece, c), lambda payload, c=codec: decompress(payload, c))
+
+    # Dictionaries are trained on the chunks of every other file and measured
+    # on the chunks of the remaining files, so no measured text was seen in training
+    if len(documents) < 2:
+        print("\n  Need at least two files to measure a dictionary on held-out data")
+        return
+    training = split_pieces(documents[::2], args.whole)
+    held_out = split_pieces(documents[1::2], args.whole)
+    print(f"\n  With a shared dictionary (trained on {len(training)} pieces of {len(documents[::2])} files, "
+          f"measured on {len(held_out)} pieces of {len(documents[1::2])} other files):")
+    for codec in DICTIONARY_CODECS:
+        if codec not in available_codecs():
+            continue
+        baseline = run_case(f"{codec} (no dictionary)", held_out,
+                            lambda piece, c=codec: compress(piece, c), lambda payload, c=codec: decompress(payload, c))
+        try:
+            dictionary = train_dictionary(training, codec)
+        except Exception as e:
+            print(f"  {codec} dictionary training failed: {e}")
+            continue
+        ratio = run_case(f"{codec} + dictionary", held_out,
+                         lambda piece, c=codec: compress(piece, c, dictionary=dictionary),
+                         lambda payload, c=codec: decompress(payload, c, dictionary=dictionary))
+        print(f"  {codec} held-out ratio {ratio:.2f}x vs {baseline:.2f}x without ({ratio / baseline - 1:+.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+import bisect
+import hashlib
+import json
+import struct
+import numpy as np
+from compression import (DEFAULT_LEVELS, DICTIONARY_CODECS, check_codec, compress, decompress,
+                         pack_flags, train_dictionary, unpack_flags)
+from sequence_log import CHUNK, DOCUMENT, LOG_FILE, META, SequenceLog
+
+# Content-defined chunking: a boundary falls wherever the rolling hash of
+# the last 32 bytes has its top AVG_BITS bits clear, so an edit only
+# reshapes the chunks around it and near-identical documents still share
+# every other chunk. Sizes suit notes (a few KB each).
+MIN_CHUNK = 512
+AVG_BITS = 11          # ~2 KB average chunk
+MAX_CHUNK = 16384
+WINDOW = 32
+STREAM_BLOCK = 4 * 1024 * 1024
+
+# Gear table: one fixed pseudo-random 32-bit value per byte value
+GEAR = np.array(
+    [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], 'little') for i in range(256)],
+    dtype=np.uint32,
+)
+
+
+def gear_hashes(data):
+    """
+    Gear rolling hash at every byte: h[i] = sum(GEAR[data[i-j]] << j), j < 32.
+
+    Bits shifted past 32 fall off, so the hash only sees the last WINDOW
+    bytes; computing it as WINDOW shifted vector adds keeps it in NumPy.
+    """
+    values = GEAR[np.frombuffer(data, dtype=np.uint8)]
+    hashes = values.copy()
+    for shift in range(1, WINDOW):
+        hashes[shift:] += values[:-shift] << np.uint32(shift)
+    return hashes
+
+
+def chunk_boundaries(data, min_size=MIN_CHUNK, avg_bits=AVG_BITS, max_size=MAX_CHUNK):
+    """End offsets of the content-defined chunks of `data`"""
+    if not data:
+        return []
+    candidates = np.flatnonzero((gear_hashes(data) >> np.uint32(32 - avg_bits)) == 0) + 1
+
+    ends = []
+    start = 0
+    while start < len(data):
+        if len(data) - start <= min_size:
+            end = len(data)
+        else:
+            i = np.searchsorted(candidates, start + min_size)
+            end = int(candidates[i]) if i < len(candidates) else len(data)
+            end = min(end, start + max_size)
+        ends.append(end)
+        start = end
+    return ends
+
+
+def split_chunks(data):
+    """Split bytes into content-defined chunks"""
+    view = memoryview(data)
+    start = 0
+    for end in chunk_boundaries(data):
+        yield view[start:end]
+        start = end
+
+
+def split_stream(stream, block_size=STREAM_BLOCK):
+    """
+    Content-defined chunks of a binary stream, read block_size bytes at a time.
+
+    The last chunk of each block is carried into the next one, since its
+    boundary may lie further on; boundaries never depend on more than the
+    chunk being cut, so the result matches split_chunks on the whole data.
+    """
+    carry = b''
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        data = carry + block
+        start = 0
+        for end in chunk_boundaries(data)[:-1]:
+            yield data[start:end]
+            start = end
+        carry = data[start:]
+    if carry:
+        yield carry
+
+
+def encode_chunks(chunks, config, dictionary=None, known=frozenset(), sink=None):
+    """
+    Hash and compress chunks for ChunkStore.put_encoded, skipping the
+    compression of chunks whose digest is in `known`.
+
+    Returns (full SHA-256 hex of the data, size, [(digest, flags, payload or None)]).
+    Runs without a store, so process pool workers can do the heavy lifting.
+    With a `sink`, each payload is passed to sink(digest, flags, payload)
+    as soon as it's compressed and left out of the result, so only one
+    compressed chunk is held at a time.
+    """
+    codec, number = config["codec"], config["dictionary"]
+    flags = pack_flags(codec, number)
+    document_hash = hashlib.sha256()
+    size = 0
+    encoded = []
+    for chunk in chunks:
+        document_hash.update(chunk)
+        size += len(chunk)
+        digest = hashlib.sha256(chunk).digest()
+        payload = None if digest in known else compress(chunk, codec, config["level"], dictionary)
+        if sink is not None and payload is not None:
+            sink(digest, flags, payload)
+            payload = None
+        encoded.append((digest, flags, payload))
+    return document_hash.hexdigest(), size, encoded
+
+
+# Document record payload: uint64 size, then the raw 32-byte chunk digests
+DOCUMENT_HEADER = struct.Struct('<Q')
+DIGEST_SIZE = 32
+
+# Store settings live in META records: b'config' holds JSON
+# {"codec", "level", "dictionary"}, b'dict' + number holds a trained dictionary
+CONFIG_KEY = b'config'
+DICTIONARY_KEY = b'dict'
+DEFAULT_CONFIG = {"codec": "zlib", "level": DEFAULT_LEVELS["zlib"], "dictionary": 0}
+MAX_DICTIONARIES = 15
+TRAINING_SAMPLES = 4000
+
+# Documents are keyed by the full SHA-256 hex of their bytes and handed out
+# git-style: the shortest prefix, at least MIN_ID_LENGTH chars, that no other
+# stored document shares. Any unique prefix resolves, an exact key or alias
+# always wins, and a prefix two documents share is reported instead of guessed.
+#
+# Ids are derived from the document's bytes. The original map-file version
+# hashed the hex string of the text instead (sha256(hex)[:10]), so its ids
+# are not prefixes of anything here; they are kept as alias records (META
+# b'alias' + old id -> full key), consulted when no stored key matches.
+MIN_ID_LENGTH = 10
+FULL_ID_LENGTH = 64
+ALIAS_KEY = b'alias'
+
+
+def common_prefix_length(a, b):
+    n = min(len(a), len(b))
+    for i in range(n):
+        if a[i] != b[i]:
+            return i
+    return n
+
+
+class ChunkStore:
+    """
+    Deduplicating document storage on a SequenceLog: each chunk is stored
+    once, compressed with the store's codec, keyed by its SHA-256; each
+    document record lists its size and chunk digests.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self.dictionaries = {}
+        record = log.read(META, CONFIG_KEY)
+        self.config = dict(DEFAULT_CONFIG, **json.loads(record[1])) if record else dict(DEFAULT_CONFIG)
+        self._ids = None
+        self._aliases = None
+
+    # --- Document ids ---
+
+    def _sorted_ids(self):
+        """Sorted prefix index over document keys, built on first use"""
+        if self._ids is None:
+            self._ids = sorted(key.decode() for key in self.log.keys(DOCUMENT))
+        return self._ids
+
+    def add_alias(self, alias, key):
+        """Make `alias` resolve to the stored document `key` (for ids from older versions)"""
+        alias = alias.strip().lower()
+        if not self.log.contains(DOCUMENT, key.encode()):
+            raise ValueError(f"Cannot alias '{alias}' to {key}: no such document")
+        if self._aliases is None or self._aliases.get(alias) != key:
+            self.log.append(META, ALIAS_KEY + alias.encode(), key.encode())
+            if self._aliases is not None:
+                self._aliases[alias] = key
+
+    def _alias_target(self, alias):
+        if self._aliases is None:
+            self._aliases = {meta_key[len(ALIAS_KEY):].decode(): self.log.read(META, meta_key)[1].decode()
+                             for meta_key in self.log.keys(META) if meta_key.startswith(ALIAS_KEY)}
+        key = self._aliases.get(alias)
+        return key if key is not None and self.log.contains(DOCUMENT, key.encode()) else None
+
+    def matching_ids(self, prefix):
+        """Document keys starting with prefix, in sorted order"""
+        ids = self._sorted_ids()
+        i = bisect.bisect_left(ids, prefix)
+        matches = []
+        while i < len(ids) and ids[i].startswith(prefix):
+            matches.append(ids[i])
+            i += 1
+        return matches
+
+    def resolve(self, doc_id):
+        """
+        Full key for an id, unique prefix or alias; None if nothing matches.
+        Raises ValueError if the prefix matches several documents.
+        """
+        doc_id = doc_id.strip().lower()
+        if not doc_id:
+            return None
+        matches = self.matching_ids(doc_id)
+        if doc_id in matches:
+            return doc_id
+        alias = self._alias_target(doc_id)
+        if alias is not None or len(matches) <= 1:
+            return alias or (matches[0] if matches else None)
+        candidates = ', '.join(self.short_id(key) for key in matches[:5])
+        raise ValueError(f"Ambiguous id '{doc_id}' matches {len(matches)} documents: {candidates}"
+                         + (", ..." if len(matches) > 5 else ""))
+
+    def short_id(self, key):
+        """Shortest prefix of a stored key, at least MIN_ID_LENGTH chars, that no other key shares"""
+        ids = self._sorted_ids()
+        i = bisect.bisect_left(ids, key)
+        shared = 0
+        if i > 0:
+            shared = common_prefix_length(ids[i - 1], key)
+        if i + 1 < len(ids):
+            shared = max(shared, common_prefix_length(ids[i + 1], key))
+        return key[:max(MIN_ID_LENGTH, shared + 1)]
+
+    def configure(self, codec, level=None, dictionary=0):
+        """Set the codec for chunks written from now on; existing chunks keep theirs"""
+        check_codec(codec)
+        self.config = {"codec": codec, "level": DEFAULT_LEVELS[codec] if level is None else level,
+                       "dictionary": dictionary if codec in DICTIONARY_CODECS else 0}
+        self.log.append(META, CONFIG_KEY, json.dumps(self.config).encode())
+
+    def _dictionary(self, number):
+        if number and number not in self.dictionaries:
+            self.dictionaries[number] = self.log.read(META, DICTIONARY_KEY + bytes([number]))[1]
+        return self.dictionaries.get(number)
+
+    def train(self, samples=TRAINING_SAMPLES):
+        """
+        Train a shared dictionary for the store's codec from up to `samples`
+        stored chunks and use it for new chunks; returns its size in bytes.
+        """
+        codec = self.config["codec"]
+        if codec not in DICTIONARY_CODECS:
+            raise ValueError(f"Codec '{codec}' has no dictionary support, use one of {', '.join(DICTIONARY_CODECS)}")
+        number = max((key[-1] for key in self.log.keys(META) if key.startswith(DICTIONARY_KEY)), default=0) + 1
+        if number > MAX_DICTIONARIES:
+            raise ValueError("Dictionary limit reached; compact into a new store to retrain")
+
+        digests = list(self.log.keys(CHUNK))[:samples]
+        dictionary = train_dictionary([self.get_chunk(digest) for digest in digests], codec)
+        self.log.append(META, DICTIONARY_KEY + bytes([number]), dictionary)
+        self.configure(codec, self.config["level"], number)
+        return len(dictionary)
+
+    def encoder_settings(self):
+        """(config, dictionary bytes) for encode_chunks"""
+        return dict(self.config), self._dictionary(self.config["dictionary"])
+
+    def get_chunk(self, digest):
+        record = self.log.read(CHUNK, digest)
+        if record is None:
+            raise ValueError(f"Chunk {digest.hex()} is missing from {self.log.path}")
+        flags, payload = record
+        codec, number = unpack_flags(flags)
+        return decompress(payload, codec, self._dictionary(number))
+
+    def has_document(self, doc_id):
+        return self.resolve(doc_id) is not None
+
+    def document_ids(self):
+        """Full keys of every stored document"""
+        return [key.decode() for key in self.log.keys(DOCUMENT)]
+
+    def put_chunk(self, digest, flags, payload):
+        """Append one encoded chunk unless it's already stored; returns the bytes appended"""
+        if self.log.contains(CHUNK, digest):
+            return 0
+        self.log.append(CHUNK, digest, payload, flags)
+        return len(payload)
+
+    def put_encoded(self, digest, size, encoded):
+        """
+        Store a document from encode_chunks output under its full hash.
+        Returns (short id, chunk count, new chunk count, new stored bytes).
+
+        A document already stored under the same hash is only accepted if
+        its size and chunk digests match too; anything else is a collision
+        and raises ValueError rather than aliasing the stored document.
+        Chunks encoded without a payload (their digest was in encode_chunks'
+        `known` set) must already be in the log, or ValueError is raised
+        before anything is written; a stale `known` set can't leave a
+        document pointing at a chunk that was never stored.
+        """
+        digests = b''.join(chunk_digest for chunk_digest, _, _ in encoded)
+        key = digest.encode()
+        if self.log.contains(DOCUMENT, key):
+            stored_size, stored_digests = self._document_record(digest)
+            if stored_size != size or b''.join(stored_digests) != digests:
+                raise ValueError(f"Hash collision: {digest} is already stored with different content")
+            return self.short_id(digest), len(encoded), 0, 0
+
+        missing = [chunk_digest for chunk_digest, _, payload in encoded
+                   if payload is None and not self.log.contains(CHUNK, chunk_digest)]
+        if missing:
+            raise ValueError(f"Document {digest} references {len(missing)} chunk(s) not in the store, "
+                             f"first {missing[0].hex()}; re-encode it against the current store")
+
+        new_chunks = 0
+        new_bytes = 0
+        for chunk_digest, flags, payload in encoded:
+            appended = 0 if payload is None else self.put_chunk(chunk_digest, flags, payload)
+            if appended:
+                new_chunks += 1
+                new_bytes += appended
+        self.log.append(DOCUMENT, key, DOCUMENT_HEADER.pack(size) + digests)
+        if self._ids is not None:
+            bisect.insort(self._ids, digest)
+        return self.short_id(digest), len(encoded), new_chunks, new_bytes
+
+    def put_document(self, data):
+        """Chunk and store `data`; returns (short id, chunk count, new chunk count, new stored bytes)"""
+        config, dictionary = self.encoder_settings()
+        digest, size, encoded = encode_chunks(split_chunks(data), config, dictionary, self.log.keys(CHUNK))
+        return self.put_encoded(digest, size, encoded)
+
+    def _document_record(self, key):
+        record = self.log.read(DOCUMENT, key.encode())
+        if record is None:
+            return None, []
+        payload = record[1]
+        size, = DOCUMENT_HEADER.unpack_from(payload)
+        body = payload[DOCUMENT_HEADER.size:]
+        return size, [body[i:i + DIGEST_SIZE] for i in range(0, len(body), DIGEST_SIZE)]
+
+    def get_document(self, doc_id):
+        """
+        Original bytes of a document by id or unique prefix, or None if it
+        isn't stored. Raises ValueError if one of its chunks is missing.
+        """
+        key = self.resolve(doc_id)
+        if key is None:
+            return None
+        size, digests = self._document_record(key)
+        try:
+            return b''.join(self.get_chunk(digest) for digest in digests)
+        except ValueError as e:
+            raise ValueError(f"Document {self.short_id(key)} is damaged: {e}") from None
+
+    def delete_document(self, doc_id):
+        key = self.resolve(doc_id)
+        if key is not None:
+            self.log.delete(key.encode())
+            self._ids = None
+
+    def live_chunks(self):
+        live = set()
+        for doc_id in self.document_ids():
+            live.update(self._document_record(doc_id)[1])
+        return live
+
+    def compact(self):
+        """Drop deleted documents and unreferenced chunks; returns (bytes before, bytes after)"""
+        result = self.log.compact(self.live_chunks())
+        self._ids = None
+        return result
+
+    def stats(self):
+        """Logical vs stored size across the whole store"""
+        logical = sum(self._document_record(doc_id)[0] for doc_id in self.document_ids())
+        stored = self.log.size()
+        return {
+            "codec": self.config["codec"] + (f" + dictionary {self.config['dictionary']}" if self.config["dictionary"] else ""),
+            "documents": len(self.log.keys(DOCUMENT)),
+            "chunks": len(self.log.keys(CHUNK)),
+            "logical_bytes": logical,
+            "stored_bytes": stored,
+            "dedup_ratio": logical / stored if stored else 0.0,
+        }
+
+
+def open_store(path=LOG_FILE, sync=False):
+    return ChunkStore(SequenceLog(path, sync=sync))
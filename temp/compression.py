@@ -0,0 +1,107 @@
+import bz2
+import lzma
+import zlib
+from collections import Counter
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Codecs for stored chunks. Each chunk record's flags byte carries the
+# codec id (low 4 bits) and the dictionary number it was compressed with
+# (high 4 bits, 0 = none), so a store can switch codecs or retrain its
+# dictionary without rewriting what's already there.
+CODEC_IDS = {'zlib': 0, 'none': 1, 'lzma': 2, 'bz2': 3, 'zstd': 4}   # zlib is 0: stores predating codecs
+CODEC_NAMES = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+DEFAULT_LEVELS = {'zlib': 6, 'none': 0, 'lzma': 6, 'bz2': 9, 'zstd': 10}
+DICTIONARY_CODECS = ('zlib', 'zstd')
+MAX_DICTIONARY = 32 * 1024   # zlib only looks back 32 KB, so a bigger zdict is wasted
+
+
+def available_codecs():
+    return [name for name in CODEC_IDS if name != 'zstd' or zstandard is not None]
+
+
+def check_codec(name):
+    if name not in CODEC_IDS:
+        raise ValueError(f"Unknown codec '{name}', expected one of {', '.join(CODEC_IDS)}")
+    if name == 'zstd' and zstandard is None:
+        raise ValueError("zstd needs the optional 'zstandard' package (pip install zstandard)")
+
+
+def pack_flags(codec, dictionary_number=0):
+    return CODEC_IDS[codec] | (dictionary_number << 4)
+
+
+def unpack_flags(flags):
+    return CODEC_NAMES[flags & 0x0F], flags >> 4
+
+
+def compress(data, codec='zlib', level=None, dictionary=None):
+    level = DEFAULT_LEVELS[codec] if level is None else level
+    if codec == 'none':
+        return bytes(data)
+    if codec == 'zlib':
+        if dictionary:
+            compressor = zlib.compressobj(level, zdict=dictionary)
+            return compressor.compress(data) + compressor.flush()
+        return zlib.compress(data, level)
+    if codec == 'lzma':
+        return lzma.compress(data, preset=level)
+    if codec == 'bz2':
+        return bz2.compress(data, compresslevel=level)
+    if codec == 'zstd':
+        check_codec(codec)
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdCompressor(level=level, dict_data=dict_data).compress(data)
+    raise ValueError(f"Unknown codec '{codec}'")
+
+
+def decompress(payload, codec='zlib', dictionary=None):
+    if codec == 'none':
+        return bytes(payload)
+    if codec == 'zlib':
+        if dictionary:
+            decompressor = zlib.decompressobj(zdict=dictionary)
+            return decompressor.decompress(payload) + decompressor.flush()
+        return zlib.decompress(payload)
+    if codec == 'lzma':
+        return lzma.decompress(payload)
+    if codec == 'bz2':
+        return bz2.decompress(payload)
+    if codec == 'zstd':
+        check_codec(codec)
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(payload)
+    raise ValueError(f"Unknown codec '{codec}'")
+
+
+def train_dictionary(samples, codec='zlib', size=MAX_DICTIONARY):
+    """
+    Shared dictionary for compressing many small chunks.
+
+    zstd uses its own trainer. For zlib the dictionary is the lines that
+    recur across samples (markdown boilerplate, front matter, headings),
+    most common last since zlib reaches closer matches more cheaply.
+    """
+    samples = [bytes(sample) for sample in samples if sample]
+    if codec == 'zstd':
+        check_codec(codec)
+        return zstandard.train_dictionary(size, samples).as_bytes()
+    if codec != 'zlib':
+        raise ValueError(f"Dictionaries are only supported for {', '.join(DICTIONARY_CODECS)}")
+
+    counts = Counter()
+    for sample in samples:
+        counts.update(set(line.strip() for line in sample.splitlines() if len(line.strip()) >= 4))
+    common = [(count * len(line), line) for line, count in counts.items() if count >= 2]
+
+    picked = []
+    total = 0
+    for _, line in sorted(common, reverse=True):
+        if total + len(line) + 1 > size:
+            continue
+        picked.append(line)
+        total += len(line) + 1
+    return b'\n'.join(reversed(picked))
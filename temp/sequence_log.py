@@ -0,0 +1,285 @@
+import logging
+import os
+import struct
+import zlib
+
+# --- Configuration ---
+LOG_FILE = "sequence_store.log"
+
+# Append-only record log plus an append-only offset index:
+#
+#   sequence_store.log  MAGIC, 16-byte log id, then records:
+#                       kind (1 byte), flags (1), key length (2), payload length (4),
+#                       crc32 of key + payload (4), key, payload
+#   sequence_store.idx  MAGIC, the same log id, then entries:
+#                       kind (1), key length (1), offset (8), key
+#
+# Inserts append one record and one index entry, so they cost the same no
+# matter how big the store is, and nothing already written is rewritten.
+# Opening loads the index into dicts, trusting it only up to the last entry
+# whose record passes its CRC; the log past that point (records the index
+# missed in a crash between the two appends) is rescanned, and a torn
+# record at the end is truncated away. Compaction writes live records
+# to fresh files and swaps them in; a fresh log id makes a stale index
+# detectable, in which case it is rebuilt from a full scan.
+LOG_MAGIC = b"SEQLOG1\n"
+INDEX_MAGIC = b"SEQIDX1\n"
+LOG_ID_SIZE = 16
+RECORD_HEADER = struct.Struct('<BBHII')
+INDEX_ENTRY = struct.Struct('<BBQ')
+
+CHUNK = ord('C')
+DOCUMENT = ord('D')
+META = ord('M')
+TOMBSTONE = ord('X')
+RECORD_KINDS = (CHUNK, DOCUMENT, META, TOMBSTONE)
+
+logger = logging.getLogger(__name__)
+
+
+def index_path_for(log_path):
+    return os.path.splitext(log_path)[0] + '.idx'
+
+
+class SequenceLog:
+    def __init__(self, path=LOG_FILE, sync=False):
+        self.path = path
+        self.index_path = index_path_for(path)
+        self.sync = sync
+        self.offsets = {CHUNK: {}, DOCUMENT: {}, META: {}}
+        self._open()
+
+    # --- Opening and recovery ---
+
+    def _open(self):
+        if not os.path.exists(self.path):
+            with open(self.path, 'wb') as f:
+                f.write(LOG_MAGIC + os.urandom(LOG_ID_SIZE))
+        self.log = open(self.path, 'r+b')
+        header = self.log.read(len(LOG_MAGIC) + LOG_ID_SIZE)
+        if not header.startswith(LOG_MAGIC):
+            raise ValueError(f"{self.path} is not a sequence log")
+        self.log_id = header[len(LOG_MAGIC):]
+        self.data_start = len(header)
+
+        entries = self._load_index()
+        self._recover(self._verified_end(entries))
+
+    def _reset_index(self):
+        """Start an empty index; the caller's scan from data_start refills it"""
+        self.offsets = {CHUNK: {}, DOCUMENT: {}, META: {}}
+        with open(self.index_path, 'wb') as f:
+            f.write(INDEX_MAGIC + self.log_id)
+        self.index = open(self.index_path, 'ab')
+        return []
+
+    def _load_index(self):
+        """Read index entries as [(kind, key, offset, position in the index file)], in log order"""
+        self.offsets = {CHUNK: {}, DOCUMENT: {}, META: {}}
+        valid = False
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            valid = data[:len(INDEX_MAGIC)] == INDEX_MAGIC and \
+                data[len(INDEX_MAGIC):len(INDEX_MAGIC) + LOG_ID_SIZE] == self.log_id
+        if not valid:
+            return self._reset_index()
+
+        entries = []
+        pos = len(INDEX_MAGIC) + LOG_ID_SIZE
+        while pos + INDEX_ENTRY.size <= len(data):
+            kind, key_len, offset = INDEX_ENTRY.unpack_from(data, pos)
+            if pos + INDEX_ENTRY.size + key_len > len(data):
+                break
+            entries.append((kind, data[pos + INDEX_ENTRY.size:pos + INDEX_ENTRY.size + key_len], offset, pos))
+            pos += INDEX_ENTRY.size + key_len
+
+        if pos < len(data):
+            # Torn trailing entry from an interrupted append
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(pos)
+        self.index = open(self.index_path, 'ab')
+        return entries
+
+    def _verified_end(self, entries):
+        """
+        Apply index entries up to the last one whose record passes its CRC
+        and return where that record ends. Entries after it (the index got
+        ahead of a torn or lost log tail) are cut from the index file; the
+        caller rescans the log from the returned offset.
+        """
+        keep = 0
+        end = self.data_start
+        for i in range(len(entries) - 1, -1, -1):
+            kind, key, offset, _ = entries[i]
+            record, record_end = self._check_record(offset)
+            if record is not None and record[:2] == (kind, key):
+                keep, end = i + 1, record_end
+                break
+        if keep < len(entries):
+            self.index.close()
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(entries[keep][3])
+            self.index = open(self.index_path, 'ab')
+        for kind, key, offset, _ in entries[:keep]:
+            self._apply(kind, key, offset)
+        return end
+
+    def _check_record(self, offset):
+        """
+        (record, end) for the record at offset: record is (kind, key, payload),
+        or None if it is torn or fails its CRC; end is where its header says
+        it ends, or None if the header itself is unreadable.
+        """
+        self.log.seek(offset)
+        header = self.log.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return None, None
+        kind, _, key_len, payload_len, crc = RECORD_HEADER.unpack(header)
+        if kind not in RECORD_KINDS:
+            return None, None
+        body = self.log.read(key_len + payload_len)
+        end = offset + RECORD_HEADER.size + key_len + payload_len
+        if len(body) < key_len + payload_len or zlib.crc32(body) != crc:
+            return None, end
+        return (kind, body[:key_len], body[key_len:]), end
+
+    def _recover(self, start):
+        """
+        Index the records past `start`, checking each CRC.
+
+        A bad record followed by a valid one is skipped with a warning (it
+        stays in the log until compaction). A torn record at the very end is
+        cut off. Anything else the scan can't get past is copied to
+        <log>.corrupt-<offset> before the log is truncated, so no bytes are
+        dropped silently. The log is never extended.
+        """
+        size = self.log.seek(0, os.SEEK_END)
+        offset = start
+        while offset < size:
+            record, end = self._check_record(offset)
+            if record is None:
+                if end is not None and end < size and self._check_record(end)[0] is not None:
+                    logger.warning("%s: skipping corrupt record at offset %d (%d bytes)", self.path, offset, end - offset)
+                    offset = end
+                    continue
+                break
+            kind, key, _ = record
+            self._apply(kind, key, offset)
+            self._write_index(kind, key, offset)
+            offset = end
+
+        if offset < size:
+            record, end = self._check_record(offset)
+            if end is not None and end > size:
+                logger.warning("%s: dropping torn record at offset %d", self.path, offset)
+            else:
+                salvage_path = f"{self.path}.corrupt-{offset}"
+                self.log.seek(offset)
+                with open(salvage_path, 'wb') as f:
+                    f.write(self.log.read(size - offset))
+                logger.warning("%s: unreadable data at offset %d, moved %d bytes to %s",
+                               self.path, offset, size - offset, salvage_path)
+            self.log.truncate(offset)
+        self.end = offset
+        self.index.flush()
+
+    def _apply(self, kind, key, offset):
+        if kind == TOMBSTONE:
+            self.offsets[DOCUMENT].pop(key, None)
+        else:
+            self.offsets[kind][key] = offset
+
+    # --- Writing ---
+
+    def _write_index(self, kind, key, offset):
+        self.index.write(INDEX_ENTRY.pack(kind, len(key), offset) + key)
+
+    def append(self, kind, key, payload=b'', flags=0):
+        """Append one record and its index entry; returns the record offset"""
+        body = key + payload
+        offset = self.end
+        self.log.seek(offset)
+        self.log.write(RECORD_HEADER.pack(kind, flags, len(key), len(payload), zlib.crc32(body)) + body)
+        self.log.flush()
+        self.end = offset + RECORD_HEADER.size + len(body)
+
+        self._write_index(kind, key, offset)
+        self.index.flush()
+        if self.sync:
+            os.fsync(self.log.fileno())
+            os.fsync(self.index.fileno())
+        self._apply(kind, key, offset)
+        return offset
+
+    def delete(self, key):
+        if key in self.offsets[DOCUMENT]:
+            self.append(TOMBSTONE, key)
+
+    # --- Reading ---
+
+    def contains(self, kind, key):
+        return key in self.offsets[kind]
+
+    def keys(self, kind):
+        return self.offsets[kind].keys()
+
+    def read(self, kind, key):
+        """(flags, payload) of the live record for key, read with one seek; None if absent"""
+        offset = self.offsets[kind].get(key)
+        if offset is None:
+            return None
+        self.log.seek(offset)
+        _, flags, key_len, payload_len, crc = RECORD_HEADER.unpack(self.log.read(RECORD_HEADER.size))
+        body = self.log.read(key_len + payload_len)
+        if zlib.crc32(body) != crc:
+            raise ValueError(f"Corrupt record at offset {offset} in {self.path}")
+        return flags, body[key_len:]
+
+    def size(self):
+        return self.end
+
+    # --- Maintenance ---
+
+    def compact(self, live_chunks):
+        """
+        Rewrite the log with only live documents, store settings and the
+        chunks in `live_chunks`; returns (bytes before, bytes after).
+        """
+        before = self.end
+        tmp_path = self.path + '.compact'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        tmp_index = index_path_for(tmp_path)
+        if os.path.exists(tmp_index):
+            os.remove(tmp_index)
+
+        fresh = SequenceLog(tmp_path)
+        for kind, keys in ((META, list(self.offsets[META])),
+                           (CHUNK, [k for k in self.offsets[CHUNK] if k in live_chunks]),
+                           (DOCUMENT, list(self.offsets[DOCUMENT]))):
+            for key in keys:
+                flags, payload = self.read(kind, key)
+                fresh.append(kind, key, payload, flags)
+        os.fsync(fresh.log.fileno())
+        os.fsync(fresh.index.fileno())
+        after = fresh.end
+        fresh.close()
+        self.close()
+
+        # A crash between the two renames leaves an index whose log id no
+        # longer matches, which the next open detects and rebuilds
+        os.replace(tmp_path, self.path)
+        os.replace(tmp_index, self.index_path)
+        self._open()
+        return before, after
+
+    def close(self):
+        self.log.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
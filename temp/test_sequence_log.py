@@ -0,0 +1,107 @@
+import glob
+import os
+import pytest
+from sequence_log import CHUNK, DOCUMENT, RECORD_HEADER, SequenceLog, index_path_for
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'store.log')
+
+
+def fill(path, count, start=0):
+    offsets = {}
+    with SequenceLog(path) as log:
+        for i in range(start, start + count):
+            offsets[i] = log.append(DOCUMENT, b'doc%d' % i, b'payload %d' % i * 10)
+    return offsets
+
+
+def contents(log):
+    return {key: log.read(DOCUMENT, key)[1] for key in log.keys(DOCUMENT)}
+
+
+def chop(path, count):
+    """Cut the last `count` bytes off a file, like a crash mid-write"""
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - count)
+
+
+def test_torn_tail_keeps_later_appends(path):
+    fill(path, 5)
+    size = os.path.getsize(path)
+    chop(path, 5)
+
+    with SequenceLog(path) as log:
+        assert os.path.getsize(path) < size - 5   # torn record cut off, never padded
+        assert sorted(log.keys(DOCUMENT)) == [b'doc%d' % i for i in range(4)]
+        log.append(DOCUMENT, b'after', b'written after recovery')
+        expected = contents(log)
+
+    os.remove(index_path_for(path))
+    with SequenceLog(path) as log:
+        assert contents(log) == expected
+
+
+def test_index_ahead_of_log(path):
+    fill(path, 3)
+    index_size = os.path.getsize(index_path_for(path))
+    offsets = fill(path, 2, start=3)
+    # The index kept entries for two records the log lost
+    chop(path, os.path.getsize(path) - offsets[3])
+
+    with SequenceLog(path) as log:
+        assert sorted(log.keys(DOCUMENT)) == [b'doc0', b'doc1', b'doc2']
+        assert os.path.getsize(index_path_for(path)) == index_size
+        assert log.append(DOCUMENT, b'doc9', b'new') == offsets[3]
+        assert log.read(DOCUMENT, b'doc2')[1] == b'payload 2' * 10
+    with SequenceLog(path) as log:
+        assert log.read(DOCUMENT, b'doc9')[1] == b'new'
+
+
+def test_torn_index_is_rebuilt_from_log(path):
+    fill(path, 4)
+    chop(index_path_for(path), 3)
+    with SequenceLog(path) as log:
+        assert len(log.keys(DOCUMENT)) == 4
+    with SequenceLog(path) as log:
+        assert len(log.keys(DOCUMENT)) == 4
+
+
+def test_lost_index_is_rebuilt(path):
+    fill(path, 4)
+    with SequenceLog(path) as log:
+        log.delete(b'doc1')
+        log.append(CHUNK, b'c' * 32, b'chunk')
+    os.remove(index_path_for(path))
+
+    with SequenceLog(path) as log:
+        assert sorted(log.keys(DOCUMENT)) == [b'doc0', b'doc2', b'doc3']
+        assert log.read(CHUNK, b'c' * 32)[1] == b'chunk'
+
+
+def test_corrupt_record_mid_log_is_skipped(path):
+    offsets = fill(path, 4)
+    with open(path, 'r+b') as f:
+        f.seek(offsets[1] + RECORD_HEADER.size + 2)
+        f.write(b'!')
+    os.remove(index_path_for(path))
+
+    with SequenceLog(path) as log:
+        assert sorted(log.keys(DOCUMENT)) == [b'doc0', b'doc2', b'doc3']
+        assert log.read(DOCUMENT, b'doc3')[1] == b'payload 3' * 10
+
+
+def test_unreadable_data_is_set_aside(path):
+    offsets = fill(path, 4)
+    with open(path, 'r+b') as f:
+        f.seek(offsets[1])
+        f.write(b'\0' * RECORD_HEADER.size)   # header gone, later records unreachable
+    os.remove(index_path_for(path))
+
+    with SequenceLog(path) as log:
+        assert sorted(log.keys(DOCUMENT)) == [b'doc0']
+    salvaged = glob.glob(path + '.corrupt-*')
+    assert salvaged == [f"{path}.corrupt-{offsets[1]}"]
+    with open(salvaged[0], 'rb') as f:
+        assert b'payload 3' in f.read()
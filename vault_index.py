@@ -0,0 +1,94 @@
+# vault_index.py - Concurrent note reading and link extraction for the vault graph
+
+import re
+import os
+import hashlib
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+WIKI_LINK_PATTERN = re.compile(r'\[\[(.*?)\]\]')
+
+# Reads are I/O bound, so a bounded thread pool hides storage latency.
+# Parsing only moves to worker processes once the vault is big enough to
+# pay for process startup and pickling the note contents.
+READ_WORKERS = 16
+PROCESS_POOL_MIN_NOTES = 2000
+PARSE_CHUNKSIZE = 256
+
+IndexStats = namedtuple("IndexStats", ["notes", "seconds", "notes_per_second", "parse_mode", "unreadable"])
+
+logger = logging.getLogger(__name__)
+
+def extract_links(content):
+    """Extract wiki links from content"""
+    return WIKI_LINK_PATTERN.findall(content)
+
+def read_note(path):
+    """Read a single note"""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def try_read_note(path):
+    """(content, None), or ("", reason) if the note can't be read or decoded"""
+    try:
+        return read_note(path), None
+    except (OSError, UnicodeDecodeError) as e:
+        return "", f"{type(e).__name__}: {e}"
+
+def read_notes(files, max_workers=READ_WORKERS):
+    """
+    Read notes concurrently through a bounded thread pool, preserving order.
+
+    Returns (contents, [(path, reason)]); a note that can't be read counts
+    as empty for the graph, and is logged and reported instead of dropped.
+    """
+    if not files:
+        return [], []
+    workers = max(1, min(max_workers, len(files)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(try_read_note, files))
+
+    unreadable = [(path, reason) for path, (_, reason) in zip(files, results) if reason is not None]
+    for path, reason in unreadable:
+        logger.warning("Could not read note %s: %s", path, reason)
+    return [content for content, _ in results], unreadable
+
+def parse_notes(contents, process_threshold=PROCESS_POOL_MIN_NOTES):
+    """Extract links from every note, fanning out to processes for large vaults"""
+    if len(contents) >= process_threshold and (os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor() as pool:
+            return list(pool.map(extract_links, contents, chunksize=PARSE_CHUNKSIZE)), "process"
+    return [extract_links(content) for content in contents], "inline"
+
+def load_notes(files):
+    """
+    Read and parse every note once.
+
+    Returns ({path: content}, {path: [links]}, IndexStats) so callers can
+    build nodes, edges and note embeddings without touching the disk again.
+    """
+    start = time.perf_counter()
+    contents, unreadable = read_notes(files)
+    links, parse_mode = parse_notes(contents)
+    elapsed = time.perf_counter() - start
+
+    rate = len(files) / elapsed if elapsed > 0 else float(len(files))
+    stats = IndexStats(len(files), elapsed, rate, parse_mode, unreadable)
+    return dict(zip(files, contents)), dict(zip(files, links)), stats
+
+def vault_version(files):
+    """
+    Fingerprint of the vault's note paths, sizes and modification times.
+    Costs one stat() per note, so it can be checked on every rerun to tell
+    whether anything derived from the notes needs rebuilding.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(files):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        digest.update(f"{path}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()